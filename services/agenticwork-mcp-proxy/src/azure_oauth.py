@@ -6,27 +6,112 @@ Implements OAuth2 + PKCE flow for Azure AD authentication.
 Reuses the same Azure AD app registration as the main application.
 """
 
+import asyncio
+import functools
 import os
 import secrets
 import hashlib
 import base64
 import logging
-import json
+import time
+import zlib
+from collections import OrderedDict
 from typing import Dict, Optional, Any
-from datetime import datetime, timedelta
 import msal
-import jwt
-import redis
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
 
 logger = logging.getLogger("azure-oauth")
 
+# Max number of decoded tokens kept in the in-process claims cache
+CLAIMS_CACHE_SIZE = 4096
+
+# Azure AD authority URL, filled in with the tenant ID
+_AUTHORITY_TEMPLATE = "https://login.microsoftonline.com/{}".format
+
+# Scopes for Azure AD + Microsoft Graph (immutable so MSAL's scope-keyed cache lookups stay stable)
+_DEFAULT_SCOPES = (
+    "https://management.azure.com/.default",  # Azure Resource Manager
+    "User.Read",  # Microsoft Graph
+    "openid",
+    "profile",
+    "email",
+    "offline_access"  # Get refresh token
+)
+
+# Shared keep-alive HTTP session for MSAL, so token calls to login.microsoftonline.com
+# reuse pooled TLS connections instead of handshaking on every exchange
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+))
+
+SESSION_TTL = 86400  # 24 hours
+
+# Fields stored in the session:{shard}:{id} Redis hash
+# (sessions from before the hash layout are JSON strings at session:{id} until they expire)
+SESSION_FIELDS = (
+    "user_id",
+    "email",
+    "name",
+    "tenant_id",
+    "access_token",
+    "refresh_token",
+    "created_at",
+    "expires_at"
+)
+
+
+def _is_wrong_type(error: ResponseError) -> bool:
+    """Whether Redis rejected a command because the key holds another type (e.g. a legacy string session)"""
+    # Pipelines prefix the server's message with the failing command, so match anywhere
+    return "WRONGTYPE" in str(error)
+
+
+@functools.lru_cache(maxsize=64)
+def _get_msal_app(tenant_id: str, client_id: str, client_secret: str) -> msal.ConfidentialClientApplication:
+    """
+    Get the MSAL confidential client app for a tenant/client (built once per process)
+
+    MSAL runs authority (OIDC metadata) discovery when the app is constructed,
+    so caching the app also caches discovery.
+
+    Args:
+        tenant_id: Azure AD tenant ID
+        client_id: App registration client ID
+        client_secret: App registration client secret
+
+    Returns:
+        ConfidentialClientApplication (its token cache is in-memory, per process)
+    """
+    return msal.ConfidentialClientApplication(
+        client_id=client_id,
+        client_credential=client_secret,
+        authority=_AUTHORITY_TEMPLATE(tenant_id),
+        http_client=_HTTP_SESSION
+    )
+
 
 class AzureOAuthService:
-    """Handles Azure AD OAuth2 authentication with PKCE"""
+    """
+    Handles Azure AD OAuth2 authentication with PKCE
+
+    MSAL only ships a blocking (requests-based) client, so every MSAL call is
+    pushed onto a worker thread with asyncio.to_thread to keep the event loop free.
+    """
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: aioredis.Redis):
         self.redis = redis_client
 
+        # Decoded JWT claims keyed by token digest (LRU, entries dropped once 'exp' passes)
+        self._claims_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+
         # Load Azure AD config from environment (same as main app)
         self.tenant_id = os.getenv("AZURE_AD_TENANT_ID")
         self.client_id = os.getenv("AZURE_AD_CLIENT_ID")
@@ -39,24 +124,10 @@ class AzureOAuthService:
                 "AZURE_AD_CLIENT_ID, and AZURE_AD_CLIENT_SECRET"
             )
 
-        self.authority = f"https://login.microsoftonline.com/{self.tenant_id}"
-
-        # Scopes for Azure AD + Microsoft Graph
-        self.scopes = [
-            "https://management.azure.com/.default",  # Azure Resource Manager
-            "User.Read",  # Microsoft Graph
-            "openid",
-            "profile",
-            "email",
-            "offline_access"  # Get refresh token
-        ]
-
-        # Create MSAL confidential client app
-        self.msal_app = msal.ConfidentialClientApplication(
-            client_id=self.client_id,
-            client_credential=self.client_secret,
-            authority=self.authority
-        )
+        self.authority = _AUTHORITY_TEMPLATE(self.tenant_id)
+        self.scopes = _DEFAULT_SCOPES
+
+        self.msal_app = _get_msal_app(self.tenant_id, self.client_id, self.client_secret)
 
         logger.info(f"Azure OAuth initialized - Tenant: {self.tenant_id}, Redirect: {self.redirect_uri}")
 
@@ -68,15 +139,15 @@ class AzureOAuthService:
             (code_verifier, code_challenge) tuple
         """
         # Generate random code verifier (43-128 characters)
-        code_verifier = base64.urlsafe_b64encode(secrets.token_bytes(32)).decode('utf-8').rstrip('=')
+        code_verifier = secrets.token_urlsafe(32)
 
         # Create SHA256 hash of verifier for challenge
-        challenge = hashlib.sha256(code_verifier.encode('utf-8')).digest()
-        code_challenge = base64.urlsafe_b64encode(challenge).decode('utf-8').rstrip('=')
+        challenge = hashlib.sha256(code_verifier.encode('ascii')).digest()
+        code_challenge = base64.urlsafe_b64encode(challenge).rstrip(b'=').decode('ascii')
 
         return code_verifier, code_challenge
 
-    def generate_auth_url(self) -> Dict[str, str]:
+    async def generate_auth_url(self) -> Dict[str, str]:
         """
         Generate Azure AD authorization URL with PKCE
 
@@ -90,14 +161,17 @@ class AzureOAuthService:
         state = secrets.token_urlsafe(32)
 
         # Store code_verifier in Redis with state as key (expires in 10 minutes)
-        self.redis.setex(
+        # NOTE: state is single-use and unrelated to other keys, so pkce:{state} has no
+        # hash tag - in Redis Cluster it is routed by its own slot and never pipelined
+        await self.redis.setex(
             f"pkce:{state}",
             600,  # 10 minutes
             code_verifier
         )
 
         # Build authorization URL
-        auth_url = self.msal_app.get_authorization_request_url(
+        auth_url = await asyncio.to_thread(
+            self.msal_app.get_authorization_request_url,
             scopes=self.scopes,
             state=state,
             redirect_uri=self.redirect_uri,
@@ -112,7 +186,7 @@ class AzureOAuthService:
             "state": state
         }
 
-    def exchange_code_for_token(self, code: str, state: str) -> Dict[str, Any]:
+    async def exchange_code_for_token(self, code: str, state: str) -> Dict[str, Any]:
         """
         Exchange authorization code for access token
 
@@ -123,8 +197,9 @@ class AzureOAuthService:
         Returns:
             Dict with token information
         """
-        # Retrieve code_verifier from Redis
-        code_verifier = self.redis.get(f"pkce:{state}")
+        # Retrieve and consume code_verifier in one round-trip (GETDEL, Redis >= 6.2)
+        # The state is single-use, so removing it up front also blocks replays
+        code_verifier = await self.redis.getdel(f"pkce:{state}")
 
         if not code_verifier:
             raise ValueError("Invalid or expired state parameter")
@@ -132,16 +207,14 @@ class AzureOAuthService:
         code_verifier = code_verifier.decode('utf-8')
 
         # Exchange code for tokens using MSAL
-        result = self.msal_app.acquire_token_by_authorization_code(
+        result = await asyncio.to_thread(
+            self.msal_app.acquire_token_by_authorization_code,
             code=code,
             scopes=self.scopes,
             redirect_uri=self.redirect_uri,
             code_verifier=code_verifier
         )
 
-        # Clean up used code_verifier
-        self.redis.delete(f"pkce:{state}")
-
         if "error" in result:
             error_msg = result.get("error_description", result.get("error"))
             logger.error(f"Token exchange failed: {error_msg}")
@@ -167,14 +240,34 @@ class AzureOAuthService:
         Returns:
             Dict with token claims
         """
+        # JWTs are immutable, so a token we've already decoded can be served from cache
+        cache_key = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+        cached = self._claims_cache.get(cache_key)
+        if cached is not None:
+            exp = cached.get("exp")
+            if exp is None or exp > time.time():
+                self._claims_cache.move_to_end(cache_key)
+                return cached
+            del self._claims_cache[cache_key]
+
         try:
-            # Decode without verification (we trust tokens from MSAL)
-            decoded = jwt.decode(token, options={"verify_signature": False})
-            return decoded
+            # Decode without verification (we trust tokens from MSAL) - only the
+            # payload segment is needed, so skip the header/signature entirely
+            _, payload_b64, _ = token.split(".", 2)
+            pad = "=" * (-len(payload_b64) % 4)
+            decoded = orjson.loads(base64.urlsafe_b64decode(payload_b64 + pad))
+            if not isinstance(decoded, dict):
+                raise ValueError("payload is not a JSON object")
         except Exception as e:
             logger.error(f"Failed to decode token: {str(e)}")
             raise ValueError(f"Invalid token format: {str(e)}")
 
+        self._claims_cache[cache_key] = decoded
+        if len(self._claims_cache) > CLAIMS_CACHE_SIZE:
+            self._claims_cache.popitem(last=False)
+
+        return decoded
+
     def extract_user_info(self, tokens: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extract user information from tokens
@@ -188,12 +281,15 @@ class AzureOAuthService:
         access_token = tokens["access_token"]
         claims = self.decode_token(access_token)
 
+        # Integer epoch math (expires_in may arrive as a string from some endpoints)
+        now = time.time_ns() // 1_000_000_000
+
         user_info = {
             "user_id": claims.get("oid") or claims.get("sub"),
             "email": claims.get("preferred_username") or claims.get("upn") or claims.get("email"),
             "name": claims.get("name", ""),
             "tenant_id": claims.get("tid"),
-            "token_expires": datetime.utcnow() + timedelta(seconds=tokens.get("expires_in", 3600)),
+            "token_expires_epoch": now + int(tokens.get("expires_in", 3600)),
             "access_token": access_token,
             "refresh_token": tokens.get("refresh_token")
         }
@@ -202,19 +298,32 @@ class AzureOAuthService:
 
         return user_info
 
-    def create_session(self, user_info: Dict[str, Any]) -> str:
+    @staticmethod
+    def _session_key(session_id: str) -> str:
         """
-        Create a user session in Redis
+        Redis key for a session: session:{shard}:{session_id}
 
-        Args:
-            user_info: User information dict
+        Redis Cluster hashes only the {shard} part, so all of a user's keys land
+        on one slot and can be pipelined together. IDs issued before sharding
+        (no "shard." prefix) keep their original session:{session_id} key.
+        """
+        user_shard, sep, _ = session_id.partition(".")
+        if not sep:
+            return f"session:{session_id}"
+        return f"session:{{{user_shard}}}:{session_id}"
 
-        Returns:
-            Session ID
+    def _build_session(self, user_info: Dict[str, Any]) -> tuple[str, str, Dict[str, Any]]:
         """
-        session_id = secrets.token_urlsafe(32)
+        Build a new session ID, its Redis key and the hash mapping to store
+
+        Redis hashes can't hold None, so unset fields are omitted and
+        get_session reports them as None.
+        """
+        # Prefix the ID with a shard derived from the user ID, so the session key
+        # carries a hash tag that co-locates a user's keys in Redis Cluster
+        user_shard = f"{zlib.crc32((user_info['user_id'] or '').encode('utf-8')) & 0xffff:04x}"
+        session_id = f"{user_shard}.{secrets.token_urlsafe(32)}"
 
-        # Store session in Redis (expires in 24 hours)
         session_data = {
             "user_id": user_info["user_id"],
             "email": user_info["email"],
@@ -222,21 +331,40 @@ class AzureOAuthService:
             "tenant_id": user_info["tenant_id"],
             "access_token": user_info["access_token"],
             "refresh_token": user_info.get("refresh_token"),
-            "created_at": datetime.utcnow().isoformat(),
-            "expires_at": user_info["token_expires"].isoformat()
+            # Unix epoch seconds (UTC)
+            "created_at": time.time_ns() // 1_000_000_000,
+            "expires_at": user_info["token_expires_epoch"]
         }
 
-        self.redis.setex(
-            f"session:{session_id}",
-            86400,  # 24 hours
-            json.dumps(session_data)
-        )
+        mapping = {k: v for k, v in session_data.items() if v is not None}
+
+        return session_id, self._session_key(session_id), mapping
+
+    async def create_session(self, user_info: Dict[str, Any]) -> str:
+        """
+        Create a user session in Redis, returning once it is stored
+
+        The session cookie is set right after this returns, so the hash and its
+        24 hour expiry are written in one pipelined round-trip first.
+
+        Args:
+            user_info: User information dict
+
+        Returns:
+            Session ID
+        """
+        session_id, key, mapping = self._build_session(user_info)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, SESSION_TTL)
+            await pipe.execute()
 
         logger.info(f"Created session {session_id} for user {user_info['email']}")
 
         return session_id
 
-    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve session data from Redis
 
@@ -244,16 +372,65 @@ class AzureOAuthService:
             session_id: Session ID
 
         Returns:
-            Session data dict or None if not found
+            Session data dict or None if not found or expired
+        """
+        # Redis TTL is the source of truth for session lifetime - fetch it
+        # alongside the hash in one round-trip
+        key = self._session_key(session_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(key)
+                pipe.ttl(key)
+                session_data, ttl = await pipe.execute()
+        except ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            return await self._get_legacy_session(key)
+
+        if not session_data or ttl <= 0:
+            return None
+
+        session = dict.fromkeys(SESSION_FIELDS)
+        session.update((k.decode('utf-8'), v.decode('utf-8')) for k, v in session_data.items())
+        return session
+
+    async def get_session_field(self, session_id: str, field: str) -> Optional[str]:
+        """
+        Retrieve a single session field from Redis
+
+        Args:
+            session_id: Session ID
+            field: Field name (one of SESSION_FIELDS)
+
+        Returns:
+            Field value or None if the session or field doesn't exist
         """
-        session_data = self.redis.get(f"session:{session_id}")
+        key = self._session_key(session_id)
+        try:
+            value = await self.redis.hget(key, field)
+        except ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            session = await self._get_legacy_session(key)
+            return session.get(field) if session else None
+
+        if value is None:
+            return None
+
+        return value.decode('utf-8')
+
+    async def _get_legacy_session(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read a session stored before the hash layout (a JSON string written with SETEX)"""
+        raw = await self.redis.get(key)
 
-        if not session_data:
+        if raw is None:
             return None
 
-        return json.loads(session_data.decode('utf-8'))
+        session = dict.fromkeys(SESSION_FIELDS)
+        session.update(orjson.loads(raw))
+        return session
 
-    def delete_session(self, session_id: str) -> bool:
+    async def delete_session(self, session_id: str) -> bool:
         """
         Delete a session from Redis
 
@@ -263,14 +440,14 @@ class AzureOAuthService:
         Returns:
             True if deleted, False if not found
         """
-        result = self.redis.delete(f"session:{session_id}")
+        result = await self.redis.delete(self._session_key(session_id))
 
         if result:
             logger.info(f"Deleted session {session_id}")
 
         return bool(result)
 
-    def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
+    async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         """
         Refresh an expired access token
 
@@ -280,7 +457,8 @@ class AzureOAuthService:
         Returns:
             New token dict
         """
-        result = self.msal_app.acquire_token_by_refresh_token(
+        result = await asyncio.to_thread(
+            self.msal_app.acquire_token_by_refresh_token,
             refresh_token=refresh_token,
             scopes=self.scopes
         )
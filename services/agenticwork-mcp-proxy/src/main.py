@@ -5,27 +5,37 @@ Hosts and manages ALL MCP servers for the AgenticWork platform
 """
 
 import asyncio
-import json
+import collections
+import functools
+import hashlib
 import logging
+import logging.handlers
 import os
+import queue
+import re
 import jwt
+from jwt.algorithms import RSAAlgorithm
 import httpx
+import msgspec
+import orjson
 import time
-import redis
-import subprocess
+from redis import asyncio as aioredis
+import socket
 import uuid
 from typing import Dict, Any, Optional, List, Union
-from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks, Cookie, Response
+from fastapi import FastAPI, HTTPException, Depends, Request, Cookie, Header, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import FileResponse, ORJSONResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 import uvicorn
 from contextlib import asynccontextmanager
 
-from mcp_manager import MCPManager, MCPServerStatus
+from mcp_manager import MCPManager, MCPServerBusyError, MCPServerStatus
 from user_session_manager import get_user_session_manager
 from azure_oauth import AzureOAuthService
 
@@ -36,6 +46,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger("mcp-proxy")
 
+# While the app runs, log records are handed to a background thread for output so stream
+# writes (and the handler lock) never block the event loop under concurrent requests
+log_listener: Optional[logging.handlers.QueueListener] = None
+_log_output_handlers: List[logging.Handler] = []
+
+def start_log_listener() -> None:
+    """Route root logger records through a queue to the original handlers on a background thread"""
+    global log_listener, _log_output_handlers
+    if log_listener:
+        return
+    root_logger = logging.getLogger()
+    record_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _log_output_handlers = root_logger.handlers[:]
+    log_listener = logging.handlers.QueueListener(record_queue, *_log_output_handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(record_queue)]
+    log_listener.start()
+
+def stop_log_listener() -> None:
+    """Put the original handlers back, then flush the records still queued for output"""
+    global log_listener
+    if not log_listener:
+        return
+    logging.getLogger().handlers = _log_output_handlers
+    log_listener.stop()
+    log_listener = None
+
 # Set detailed logging for MCP interactions
 logging.getLogger("mcp-manager").setLevel(logging.INFO)
 
@@ -47,21 +83,342 @@ CLIENT_ID = os.getenv("AZURE_CLIENT_ID")
 CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
 PORT = int(os.getenv("PORT", "8080"))
 API_BASE_URL = os.getenv("API_BASE_URL", "http://agenticworkchat-api:3000")  # Internal API for logging
+API_INTERNAL_URL = os.getenv("API_INTERNAL_URL", "http://agenticwork-api:8000")  # Validates awc_ user API keys
+AGENTICWORK_API_URL = os.getenv("AGENTICWORK_API_URL", "http://agenticworkchat-api:8000").rstrip("/")  # Embeddings
+EMBEDDINGS_URL = f"{AGENTICWORK_API_URL}/api/embeddings"
+
+# Service-to-service keys
+API_INTERNAL_KEY = os.getenv("API_INTERNAL_KEY", "")
+FLOWISE_INTERNAL_API_KEY = os.getenv("FLOWISE_INTERNAL_API_KEY", "flowise-internal")
+
+# Shared secret for internal (HS256) tokens - MUST match API's JWT_SECRET/SIGNING_SECRET
+INTERNAL_JWT_SECRET = (
+    os.getenv("JWT_SECRET")
+    or os.getenv("SIGNING_SECRET")
+    or os.getenv("INTERNAL_JWT_SECRET", "dev-secret-change-in-production")
+)
+
+# Use the shared service principal for Azure MCP calls instead of OBO
+AZURE_MCP_USE_SHARED_SP = os.getenv("AZURE_MCP_USE_SHARED_SP", "false").lower() == "true"
 
 # Authentication can be disabled for local development
 # Azure AD users: Validated via Azure AD token, RBAC policies apply
 # Local admin users: No token = system admin role with full access
 ENABLE_AUTH = os.getenv("ENABLE_AUTH", "true").lower() in ("true", "1", "yes")
 
+# MCP servers non-admin users can't reach unless an explicit policy allows it
+# IMPORTANT: awp_admin and awp_kubernetes are admin-only servers
+ADMIN_ONLY_SERVERS: frozenset = frozenset({'admin', 'awp_admin', 'awp_kubernetes'})
+
+# MCP servers the /mcp and /call handlers refuse outright for non-admins, regardless of policy
+# IMPORTANT: awp_admin is the actual server name for admin tools
+ADMIN_SERVERS: frozenset = frozenset({'admin', 'awp_admin'})
+
+# MCP servers that need the caller's user_id injected into tool arguments (RBAC + workspace isolation)
+USER_ID_INJECTION_SERVERS: frozenset = frozenset({'awp_agenticwork_cli', 'awp_agenticode'})
+# Serverless tools on those servers call back to the platform API and need the caller's awc_ API key
+SERVERLESS_TOOLS: frozenset = frozenset({'run_agenticode_task', 'run_code_generation', 'run_file_operation'})
+
+# Browser origins allowed to call the proxy cross-origin (comma-separated); unset allows none.
+# The Inspector UI is served by the proxy itself, so it needs no entry
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
+
+# Azure AD groups allowed to use the proxy - same config as API (parsed once at startup)
+AUTHORIZED_USER_GROUPS = frozenset(
+    g.strip() for g in os.getenv('AAD_AUTHORIZED_USER_GROUPS', '').split(',') if g.strip()
+)
+AUTHORIZED_ADMIN_GROUPS = frozenset(
+    g.strip() for g in os.getenv('AAD_AUTHORIZED_ADMIN_GROUPS', '').split(',') if g.strip()
+)
+ALL_AUTHORIZED_GROUPS = AUTHORIZED_USER_GROUPS | AUTHORIZED_ADMIN_GROUPS
+
+# Service-to-service keys (raw keys, not JWTs) -> the service account they authenticate as.
+# Keyed by digest so a request token is matched with one hash lookup instead of
+# character-by-character string compares. Both use SP credentials for Azure calls.
+STATIC_TOKENS: Dict[bytes, Dict[str, Any]] = {}
+_static_service_accounts = (
+    # AgenticWork API internal key - used by agenticwork-api to call MCP-proxy for LLM tool execution
+    (API_INTERNAL_KEY, 'api-service', 'AgenticWork API Service', 'api@agenticwork.io'),
+    # Flowise internal API key - used by Flowise to call MCP-proxy without requiring user JWT
+    # (listed last so it wins if both keys are configured to the same value, as before)
+    (FLOWISE_INTERNAL_API_KEY, 'flowise-service', 'Flowise Service', 'flowise@agenticwork.io'),
+)
+for _key, _user_id, _user_name, _email in _static_service_accounts:
+    if _key:
+        STATIC_TOKENS[hashlib.blake2b(_key.encode('utf-8'), digest_size=32).digest()] = {
+            'token': 'SYSTEM_SP_AUTH',  # Use SP credentials for Azure calls
+            'payload': {},
+            'user_id': _user_id,
+            'user_name': _user_name,
+            'email': _email,
+            'upn': None,
+            'groups': ['service-accounts'],
+            'is_admin': True
+        }
+
+# MCP Inspector UI (debugging tool) - only spawned when explicitly enabled
+ENABLE_MCP_INSPECTOR = os.getenv("ENABLE_MCP_INSPECTOR", "false").lower() in ("true", "1", "yes")
+
+# Redis connection pool - sized for worker concurrency, connections kept alive between requests
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "128"))
+
+# Azure AD signing keys are cached in-process; an unknown kid forces a refresh
+# (at most once per JWKS_MIN_REFRESH_INTERVAL, so bogus kids can't hammer Azure AD)
+JWKS_CACHE_TTL = 3600  # 1 hour
+JWKS_MIN_REFRESH_INTERVAL = 60  # seconds
+
+# Repeated "no ID token" OBO fallbacks are logged at most once per server per interval
+OBO_FALLBACK_WARN_INTERVAL = 60  # seconds
+
+# Validated JWT user info is cached in Redis until the token's exp (the token itself is never stored)
+USER_INFO_CACHE_PREFIX = "mcpproxy:uinfo:"
+# ...with a short-lived in-process copy in front, so back-to-back requests skip the Redis GET
+USER_INFO_LOCAL_TTL = 30  # seconds (never past the token's exp)
+USER_INFO_LOCAL_SIZE = 10000
+
+# Tool name -> server index used when a tools/call arrives without a server; also rebuilt
+# whenever a server is added, started, stopped, restarted, deleted or toggled
+TOOL_INDEX_TTL = 60  # seconds
+
+# Read-only MCP methods whose identical concurrent requests share one downstream call.
+# tools/call is only coalesced when the client opts in with "X-MCP-Coalesce: true".
+COALESCED_METHODS: frozenset = frozenset({'tools/list', 'resources/list', 'prompts/list'})
+
+# Tight timeouts for identity calls on the request path (JWKS, API key validation) so a
+# slow login.microsoftonline.com or API can't hold a request open for the client default
+IDENTITY_HTTP_TIMEOUT = httpx.Timeout(connect=2.0, read=5.0, write=2.0, pool=1.0)
+
+# Per-group MCP access policies are cached in Redis - policy edits in the API take effect
+# here once the cached entry expires (nothing invalidates it early)
+ACCESS_POLICY_CACHE_PREFIX = "mcpproxy:aclgrp:"
+ACCESS_POLICY_CACHE_TTL = 120  # seconds
+
+# MCP call logs are queued and posted to the API in batches
+MCP_LOG_BATCH_SIZE = int(os.getenv("MCP_LOG_BATCH_SIZE", "100"))  # Max logs per POST
+MCP_LOG_BATCH_MS = int(os.getenv("MCP_LOG_BATCH_MS", "50"))  # Max time to wait for a batch to fill
+MCP_LOG_QUEUE_MAX = 10000  # Logs are dropped once this many are pending
+MCP_LOG_MAX_INLINE_RESULT = 64 * 1024  # Larger results are logged as size + hash + preview
+MCP_LOG_RESULT_PREVIEW = 2048  # Bytes of a truncated result kept in the log
+
+# Embedding vectors cached per input text + model/dimensions/encoding options (0 disables)
+# Stored as b"<model>\0<embedding JSON>" so hits are relayed without re-parsing the floats
+EMBEDDINGS_CACHE_PREFIX = "mcpproxy:emb:v2:"
+EMBEDDINGS_CACHE_TTL = int(os.getenv("EMBEDDINGS_CACHE_TTL", "86400"))  # seconds
+
+# Embedding inputs from concurrent requests are coalesced into one upstream request per option set
+EMBEDDINGS_BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "32"))  # Max inputs per upstream request
+EMBEDDINGS_BATCH_WAIT_MS = int(os.getenv("EMBEDDINGS_BATCH_WAIT_MS", "10"))  # Max wait for a batch to fill
+
+# Adaptive (AIMD) concurrency limits for upstream HTTP calls (embeddings API, Inspector UI):
+# the limit grows additively while recent latency stays on target and halves when it doesn't
+UPSTREAM_INITIAL_CONCURRENCY = int(os.getenv("UPSTREAM_INITIAL_CONCURRENCY", "16"))
+UPSTREAM_MIN_CONCURRENCY = 1
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "128"))
+UPSTREAM_TARGET_LATENCY = float(os.getenv("UPSTREAM_TARGET_LATENCY_MS", "500")) / 1000
+UPSTREAM_LATENCY_WINDOW = 64  # Recent latencies averaged against the target
+UPSTREAM_OVERLOAD_STATUSES = frozenset({429, 502, 503})
+UPSTREAM_DEFAULT_BACKOFF = 1.0  # seconds - used when an overloaded upstream sends no Retry-After
+UPSTREAM_MAX_BACKOFF = 60.0  # seconds
+# Pause new calls when the upstream's rate-limit headers show the quota nearly spent
+UPSTREAM_RATE_LIMIT_MIN_REQUESTS = 2  # remaining requests
+UPSTREAM_RATE_LIMIT_MIN_FRACTION = 0.1  # of the request/token limit
+
+# On shutdown, wait up to this long for in-flight embeddings/MCP work before closing clients and servers
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10"))  # seconds
+
 # Global instances
 mcp_manager: Optional[MCPManager] = None
-redis_client: Optional[redis.Redis] = None
+redis_client: Optional[aioredis.Redis] = None
 oauth_service: Optional[AzureOAuthService] = None
-inspector_process: Optional[subprocess.Popen] = None
+http_client: Optional[httpx.AsyncClient] = None  # Shared outbound HTTP client (pooled keep-alive connections)
+inspector_process: Optional[asyncio.subprocess.Process] = None
+log_queue: Optional[asyncio.Queue] = None
+log_flusher_task: Optional[asyncio.Task] = None
+
+# Validated user info by Redis cache key -> (expires-at epoch, user info with token)
+_user_info_local: Dict[str, tuple] = {}
+
+# Tool name -> name of the running server that provides it
+_tool_index: Dict[str, str] = {}
+_tool_index_expires_at = 0.0
+_tool_index_lock = asyncio.Lock()
+
+# In-flight downstream calls by (server, method, canonical params) for request coalescing
+_inflight_requests: Dict[tuple, asyncio.Task] = {}
+
+# Parsed Azure AD public keys by kid
+_jwks_cache: Dict[str, Any] = {"keys": {}, "fetched_at": 0.0}
+_jwks_lock = asyncio.Lock()
 
 # === HELPER FUNCTIONS ===
 
-async def send_mcp_log_to_api(
+class _LazyJson:
+    """Defers JSON-encoding a log argument until a handler actually emits the record"""
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return orjson.dumps(self.obj, default=str).decode()
+
+class UpstreamBackoffError(Exception):
+    """Raised while an upstream has asked us to back off (circuit open)"""
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} is backing off for {retry_after:.1f}s")
+
+_RATE_LIMIT_RESET_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_RATE_LIMIT_RESET_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+def parse_rate_limit_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After / x-ratelimit-reset-* value ("2", "1.5", "6m0s", "20ms")"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = _RATE_LIMIT_RESET_PART.findall(value)
+        if not parts:
+            return None  # e.g. Retry-After in HTTP-date form
+        return sum(float(number) * _RATE_LIMIT_RESET_UNITS[unit] for number, unit in parts)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit for one upstream.
+
+    Each call takes a slot with acquire() and hands back its start time and status with release().
+    The limit grows by 0.5 while the mean of recent latencies is on target and halves (at most once
+    per target interval) when it isn't or the upstream reports overload. 429/502/503 and connection
+    failures also open a circuit for Retry-After seconds, during which acquire() fails fast.
+    When x-ratelimit-remaining-* headers show the quota nearly spent, new calls instead wait in
+    acquire() until the matching x-ratelimit-reset-* time.
+    """
+    __slots__ = ("name", "limit", "in_flight", "open_until", "paused_until", "_latencies", "_waiters", "_last_decrease")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limit = float(UPSTREAM_INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.open_until = 0.0
+        self.paused_until = 0.0
+        self._latencies: collections.deque = collections.deque(maxlen=UPSTREAM_LATENCY_WINDOW)
+        self._waiters: collections.deque = collections.deque()
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the monotonic start time to pass to release()"""
+        now = time.monotonic()
+        if self.open_until > now:
+            raise UpstreamBackoffError(self.name, self.open_until - now)
+        if self.paused_until > now:
+            await asyncio.sleep(self.paused_until - now)
+
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+        else:
+            # release() hands the slot over (counting it in in_flight) before waking us
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    self.in_flight -= 1
+                    self._wake()
+                else:
+                    try:
+                        self._waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                raise
+        return time.monotonic()
+
+    def release(self, started: float, status_code: int = 0, headers: Optional[httpx.Headers] = None) -> None:
+        """Return a slot and adapt the limit; status_code 0 means the upstream could not be reached"""
+        self.in_flight -= 1
+        now = time.monotonic()
+
+        if headers is not None:
+            self._check_rate_limit(headers, now)
+
+        if status_code == 0 or status_code in UPSTREAM_OVERLOAD_STATUSES:
+            self._decrease(now)
+            retry_after = parse_rate_limit_reset(headers.get('retry-after')) if headers is not None else None
+            backoff = min(retry_after or UPSTREAM_DEFAULT_BACKOFF, UPSTREAM_MAX_BACKOFF)
+            self.open_until = max(self.open_until, now + backoff)
+            logger.warning("[BACKPRESSURE] %s overloaded (status %s) - limit %.1f, backing off %.1fs",
+                           self.name, status_code or "unreachable", self.limit, backoff)
+        else:
+            self._latencies.append(now - started)
+            if sum(self._latencies) / len(self._latencies) <= UPSTREAM_TARGET_LATENCY:
+                self.limit = min(UPSTREAM_MAX_CONCURRENCY, self.limit + 0.5)
+            else:
+                self._decrease(now)
+
+        self._wake()
+
+    def _check_rate_limit(self, headers: httpx.Headers, now: float) -> None:
+        for kind in ('requests', 'tokens'):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            if remaining is None:
+                continue
+            try:
+                remaining = int(remaining)
+                limit = int(headers.get(f'x-ratelimit-limit-{kind}') or 0)
+            except ValueError:
+                continue
+            if (kind == 'requests' and remaining <= UPSTREAM_RATE_LIMIT_MIN_REQUESTS) or \
+                    (limit and remaining < limit * UPSTREAM_RATE_LIMIT_MIN_FRACTION):
+                pause = parse_rate_limit_reset(headers.get(f'x-ratelimit-reset-{kind}')) or UPSTREAM_DEFAULT_BACKOFF
+                self.paused_until = max(self.paused_until, now + min(pause, UPSTREAM_MAX_BACKOFF))
+                logger.info("[BACKPRESSURE] %s %s quota nearly spent (%d left) - pausing new calls %.1fs",
+                            self.name, kind, remaining, pause)
+
+    def discard(self) -> None:
+        """Return a slot without adapting the limit (call abandoned or failed for unrelated reasons)"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _decrease(self, now: float) -> None:
+        # One multiplicative decrease per target interval, so a burst of slow responses that
+        # were all in flight together only halves the limit once
+        if now - self._last_decrease >= UPSTREAM_TARGET_LATENCY:
+            self.limit = max(UPSTREAM_MIN_CONCURRENCY, self.limit * 0.5)
+            self._last_decrease = now
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+# Backpressure for upstream HTTP calls
+embeddings_limiter = AdaptiveConcurrencyLimiter("embeddings")
+inspector_limiter = AdaptiveConcurrencyLimiter("inspector")
+
+def get_redis_pool_kwargs(host: str, port: int, password: Optional[str]) -> Dict[str, Any]:
+    """Redis connection pool settings"""
+    # TCP_KEEP* constants are Linux-specific; only set the ones this platform has
+    keepalive_options = {
+        getattr(socket, name): value
+        for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+        if hasattr(socket, name)
+    }
+    return {
+        "host": host,
+        "port": port,
+        "password": password,
+        "decode_responses": False,
+        "max_connections": REDIS_POOL_SIZE,
+        "socket_keepalive": True,
+        "socket_keepalive_options": keepalive_options,
+        "health_check_interval": 30
+    }
+
+def send_mcp_log_to_api(
     user_id: str,
     user_name: Optional[str],
     user_email: Optional[str],
@@ -74,48 +431,146 @@ async def send_mcp_log_to_api(
     execution_time_ms: float,
     success: bool
 ) -> None:
-    """Send MCP call log to API database (fire-and-forget) with full request/response data"""
+    """Queue MCP call log for the API database (fire-and-forget) with full request/response data
+
+    Only an in-memory enqueue - mcp_log_flusher does the network write - so handlers
+    call it directly instead of scheduling a background task.
+    """
+    try:
+        # ISO-8601 with real milliseconds (the API schema requires a datetime string), built
+        # inline rather than through strftime
+        sec, ms = divmod(time.time_ns() // 1_000_000, 1000)
+        t = time.gmtime(sec)
+        timestamp = f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}.{ms:03d}Z"
+
+        # Serialize the result once here: small results go into the batch as a pre-encoded
+        # fragment, large ones (file contents, kubectl dumps...) are replaced by a summary so a
+        # single call can't bloat the queue or the API's log table
+        if result is not None:
+            result_bytes = orjson.dumps(result)
+            if len(result_bytes) > MCP_LOG_MAX_INLINE_RESULT:
+                result = {
+                    "_truncated": True,
+                    "size": len(result_bytes),
+                    "sha256": hashlib.sha256(result_bytes).hexdigest(),
+                    "preview": result_bytes[:MCP_LOG_RESULT_PREVIEW].decode('utf-8', 'replace')
+                }
+            else:
+                result = orjson.Fragment(result_bytes)
+
+        log_data = {
+            "user_id": user_id,
+            "user_name": user_name,
+            "user_email": user_email,
+            "server_name": server_name,
+            "tool_name": tool_name,
+            "method": method,
+            "params": params,
+            "result": result,  # Full response data (summarized if large)
+            "error": error,
+            "execution_time_ms": execution_time_ms,
+            "success": success,
+            "timestamp": timestamp
+        }
+
+        log_queue.put_nowait(log_data)
+        logger.debug(f"MCP log queued for tool: {tool_name} by user: {user_name or user_id}")
+    except asyncio.QueueFull:
+        # API can't keep up - drop rather than hold up the response
+        logger.warning(f"MCP log queue full ({MCP_LOG_QUEUE_MAX}) - dropping log for tool: {tool_name}")
+    except Exception as e:
+        # Log but don't fail the request
+        logger.warning(f"Failed to queue MCP log: {e}")
+
+async def post_mcp_log_batch(logs: List[dict]) -> None:
+    """Send a batch of MCP call logs to the API database in one request"""
     try:
         # Use internal API key for service-to-service authentication
-        api_internal_key = os.environ.get('API_INTERNAL_KEY', '')
         headers = {
-            'Authorization': f'Bearer {api_internal_key}',
+            'Authorization': f'Bearer {API_INTERNAL_KEY}',
             'Content-Type': 'application/json'
         }
 
-        async with httpx.AsyncClient() as client:
-            log_data = {
-                "user_id": user_id,
-                "user_name": user_name,
-                "user_email": user_email,
-                "server_name": server_name,
-                "tool_name": tool_name,
-                "method": method,
-                "params": params,
-                "result": result,  # Full response data
-                "error": error,
-                "execution_time_ms": execution_time_ms,
-                "success": success,
-                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
-            }
+        response = await http_client.post(
+            f"{API_BASE_URL}/api/mcp-logs/batch",
+            content=orjson.dumps({"logs": logs}),  # orjson is much faster than httpx's stdlib json on large results
+            headers=headers,
+            timeout=5.0  # Quick timeout to not block
+        )
 
-            await client.post(
-                f"{API_BASE_URL}/api/mcp-logs",
-                json=log_data,
-                headers=headers,
-                timeout=5.0  # Quick timeout to not block
+        # The API validates the batch as a whole - one bad entry rejects all of them, so
+        # resend individually and lose only the entries that are actually invalid
+        if 400 <= response.status_code < 500 and len(logs) > 1:
+            logger.warning(
+                f"API rejected batch of {len(logs)} MCP log(s) (HTTP {response.status_code}) - "
+                f"retrying individually"
+            )
+            responses = await asyncio.gather(
+                *(
+                    http_client.post(
+                        f"{API_BASE_URL}/api/mcp-logs",
+                        content=orjson.dumps(log),
+                        headers=headers,
+                        timeout=5.0
+                    )
+                    for log in logs
+                ),
+                return_exceptions=True
             )
-            logger.debug(f"MCP log sent to API for tool: {tool_name} by user: {user_name or user_id}")
+            failed = [
+                r if isinstance(r, Exception) else f"HTTP {r.status_code}"
+                for r in responses
+                if isinstance(r, Exception) or r.is_error
+            ]
+            if failed:
+                logger.warning(f"Failed to send {len(failed)} of {len(logs)} MCP log(s) to API: {failed[0]}")
+            else:
+                logger.debug(f"Sent {len(logs)} MCP log(s) to API individually")
+            return
+
+        response.raise_for_status()
+        logger.debug(f"Sent {len(logs)} MCP log(s) to API")
     except Exception as e:
-        # Log but don't fail the request
-        logger.warning(f"Failed to send MCP log to API: {e}")
+        # Log but don't fail - these logs are dropped
+        logger.warning(f"Failed to send {len(logs)} MCP log(s) to API: {e}")
+
+async def mcp_log_flusher() -> None:
+    """Drain log_queue, posting up to MCP_LOG_BATCH_SIZE logs at most every MCP_LOG_BATCH_MS"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await log_queue.get()]
+        deadline = loop.time() + MCP_LOG_BATCH_MS / 1000
+        try:
+            while len(batch) < MCP_LOG_BATCH_SIZE:
+                # Take whatever is already queued without yielding to the loop
+                try:
+                    batch.append(log_queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                # Otherwise sleep until the next log arrives or the batch window closes
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(log_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Shutting down mid-batch - don't lose what was already dequeued
+            await post_mcp_log_batch(batch)
+            raise
+        await post_mcp_log_batch(batch)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events for MCP servers"""
-    global mcp_manager, redis_client, oauth_service, inspector_process
+    global mcp_manager, redis_client, oauth_service, http_client, inspector_process
+    global log_queue, log_flusher_task
 
+    start_log_listener()
     logger.info("=== MCP PROXY STARTUP ===")
 
     # Initialize Redis
@@ -123,39 +578,68 @@ async def lifespan(app: FastAPI):
     redis_host = os.getenv("REDIS_HOST", "redis")
     redis_port = int(os.getenv("REDIS_PORT", "6379"))
     redis_password = os.getenv("REDIS_PASSWORD", None)
-    redis_client = redis.Redis(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
-        decode_responses=False
+    redis_pool_kwargs = get_redis_pool_kwargs(redis_host, redis_port, redis_password)
+    # asyncio client - request handlers await Redis instead of blocking the event loop
+    redis_client = aioredis.Redis.from_pool(
+        aioredis.BlockingConnectionPool(**redis_pool_kwargs)
     )
-    redis_client.ping()  # Test connection
+    await redis_client.ping()  # Test connection
     logger.info(f"✅ Redis connected at {redis_host}:{redis_port}")
 
+    # Shared outbound HTTP client - reused for API logging, policy lookups, JWKS, OBO,
+    # embeddings and the Inspector UI proxy
+    # HTTP/2 is negotiated via TLS ALPN (Azure AD, external APIs); in-cluster plain-HTTP services
+    # stay on pooled HTTP/1.1 keep-alive. Connection attempts are retried before a call fails.
+    http_client = httpx.AsyncClient(
+        timeout=10.0,
+        transport=httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+            http2=True,
+            retries=2
+        )
+    )
+
+    # Batched MCP call logging
+    log_queue = asyncio.Queue(maxsize=MCP_LOG_QUEUE_MAX)
+    log_flusher_task = asyncio.create_task(mcp_log_flusher())
+
+    # Prefetch Azure AD signing keys so the first request doesn't pay for them
+    prefetch = {}
+
     # Initialize OAuth service (only if auth is enabled)
     if ENABLE_AUTH:
         logger.info("Initializing Azure OAuth service...")
+        prefetch["Azure AD JWKS"] = refresh_jwks()
         oauth_service = AzureOAuthService(redis_client)
         logger.info("✅ OAuth service initialized")
     else:
         logger.info("⚠️ Auth disabled - skipping Azure OAuth service initialization")
 
+    prefetch_results = await asyncio.gather(*prefetch.values(), return_exceptions=True)
+    for name, result in zip(prefetch, prefetch_results):
+        if isinstance(result, Exception):
+            logger.warning(f"⚠️ Failed to prefetch {name}: {result}")
+
     # Start MCP Inspector subprocess
-    logger.info("Starting MCP Inspector UI...")
-    try:
-        inspector_process = subprocess.Popen(
-            ["npx", "@modelcontextprotocol/inspector", "--no-open"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env={**os.environ, "PORT": "6274", "MCPP_PORT": "6277"}
-        )
-        logger.info(f"✅ MCP Inspector started on ports 6274/6277 (PID: {inspector_process.pid})")
-    except Exception as e:
-        logger.error(f"⚠️ Failed to start MCP Inspector: {e}")
-        inspector_process = None
+    if ENABLE_MCP_INSPECTOR:
+        logger.info("Starting MCP Inspector UI...")
+        try:
+            # Installed globally in the image - run its bin directly rather than
+            # letting npx resolve the package on every start
+            inspector_process = await asyncio.create_subprocess_exec(
+                "mcp-inspector", "--no-open",
+                env={**os.environ, "PORT": "6274", "MCPP_PORT": "6277"}
+            )
+            logger.info(f"✅ MCP Inspector started on ports 6274/6277 (PID: {inspector_process.pid})")
+        except Exception as e:
+            logger.error(f"⚠️ Failed to start MCP Inspector: {e}")
+            inspector_process = None
+    else:
+        logger.info("⚠️ MCP Inspector disabled - set ENABLE_MCP_INSPECTOR=true to enable")
 
     logger.info("Initializing MCP Manager...")
     mcp_manager = MCPManager(redis_client=redis_client)
+    await mcp_manager.load_enabled_states()
 
     logger.info("Starting all MCP servers...")
     await mcp_manager.start_all()
@@ -176,17 +660,26 @@ async def lifespan(app: FastAPI):
 
     logger.info("=== MCP PROXY SHUTDOWN ===")
 
+    # Let work that outlived its request (batched embeddings, queued MCP calls) finish before
+    # the servers and the shared HTTP client go away, instead of resetting those connections
+    embedding_batcher.flush_all()
+    drain_deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT
+    while (remaining := count_in_flight_work()) and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.1)
+    if remaining:
+        logger.warning(f"Shutting down with {remaining} upstream/MCP calls still in flight")
+
     # Stop MCP Inspector
     if inspector_process:
         logger.info("Stopping MCP Inspector...")
         inspector_process.terminate()
         try:
-            inspector_process.wait(timeout=5)
+            await asyncio.wait_for(inspector_process.wait(), timeout=5)
             logger.info("✅ MCP Inspector stopped")
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             logger.warning("Force killing MCP Inspector...")
             inspector_process.kill()
-            inspector_process.wait()
+            await inspector_process.wait()
 
     if mcp_manager:
         await mcp_manager.stop_all()
@@ -197,26 +690,57 @@ async def lifespan(app: FastAPI):
     await session_manager.stop_periodic_cleanup()
     logger.info("✅ User session manager stopped")
 
-    # Close Redis connection
+    # Stop log flusher and send whatever is still queued
+    if log_flusher_task:
+        log_flusher_task.cancel()
+        try:
+            await log_flusher_task
+        except asyncio.CancelledError:
+            pass
+
+    pending_logs = []
+    while log_queue and not log_queue.empty():
+        pending_logs.append(log_queue.get_nowait())
+    for i in range(0, len(pending_logs), MCP_LOG_BATCH_SIZE):
+        await post_mcp_log_batch(pending_logs[i:i + MCP_LOG_BATCH_SIZE])
+
+    if http_client:
+        await http_client.aclose()
+
+    # Close Redis connections
     if redis_client:
-        redis_client.close()
+        await redis_client.aclose()
         logger.info("✅ Redis connection closed")
 
+    # Flush any log records still queued for output; later records are written directly
+    stop_log_listener()
+
+def count_in_flight_work() -> int:
+    """Upstream embeddings and MCP server calls still pending or running"""
+    count = embedding_batcher.pending + embeddings_limiter.in_flight
+    if mcp_manager:
+        count += sum(server.in_flight + server.queued for server in mcp_manager.servers.values())
+    return count
+
 # FastAPI app with lifespan management
 app = FastAPI(
     title="MCP Proxy Service",
     version="2.0.0",
     description="Centralized MCP Server Management with OBO Authentication",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # Tool results can be large - serialize with orjson
 )
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure as needed
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    # Browsers reject credentialed responses with a wildcard origin, so "*" means no credentials
+    allow_credentials="*" not in CORS_ORIGINS,
+    # Everything the API routes and the Inspector proxy accept
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"],
+    allow_headers=["authorization", "content-type", "x-api-key", "x-azure-id-token", "x-mcp-coalesce"],
+    max_age=86400,  # Let browsers cache preflight results for a day
 )
 
 # Mount static files for inspector UI
@@ -244,6 +768,73 @@ class MCPToolCall(BaseModel):
     arguments: Dict[str, Any] = {}
     id: str = "1"
 
+class MCPRequestHeaders:
+    """The request headers the MCP handlers read, looked up once per request"""
+    __slots__ = ('id_token', 'api_key', 'authorization', 'coalesce')
+
+    def __init__(self, id_token: Optional[str], api_key: Optional[str], authorization: Optional[str], coalesce: bool):
+        self.id_token = id_token  # X-Azure-ID-Token - Azure AD ID token for OBO
+        self.api_key = api_key  # X-Api-Key
+        self.authorization = authorization
+        self.coalesce = coalesce  # X-MCP-Coalesce: true
+
+async def get_mcp_request_headers(request: Request) -> MCPRequestHeaders:
+    """Dependency resolving MCPRequestHeaders (async so FastAPI doesn't hop to the threadpool)"""
+    headers = request.headers
+    return MCPRequestHeaders(
+        headers.get('x-azure-id-token'),
+        headers.get('x-api-key'),
+        headers.get('authorization'),
+        (headers.get('x-mcp-coalesce') or '').lower() == 'true'
+    )
+
+_MSGSPEC_ERROR_PATH = re.compile(r"\.([^.\[`]+)|\[(\d+)\]")
+_MSGSPEC_MISSING_FIELD = re.compile(r"missing required field `([^`]+)`")
+
+def msgspec_error_detail(error: msgspec.DecodeError) -> List[Dict[str, Any]]:
+    """A msgspec decode/validation error in FastAPI's validation error format"""
+    # e.g. "Expected `str`, got `int` - at `$.arguments[0]`"
+    message, _, path = str(error).partition(" - at `$")
+    loc: List[Union[str, int]] = ["body"]
+    for key, index in _MSGSPEC_ERROR_PATH.findall(path):
+        loc.append(key or int(index))
+
+    if not isinstance(error, msgspec.ValidationError):
+        return [{"type": "json_invalid", "loc": loc, "msg": message}]
+    missing = _MSGSPEC_MISSING_FIELD.search(message)
+    if missing:
+        return [{"type": "missing", "loc": [*loc, missing.group(1)], "msg": "Field required"}]
+    return [{"type": "value_error", "loc": loc, "msg": message}]
+
+def struct_body(struct_type: type):
+    """
+    Dependency decoding the JSON request body straight into a msgspec Struct - for hot
+    endpoints where pydantic's per-field validation dominates the request cost
+
+    Errors are raised as RequestValidationError, so clients get the same 422 body as from
+    pydantic-validated endpoints. Pair with struct_openapi() to document the body.
+    """
+    decoder = msgspec.json.Decoder(struct_type)
+
+    async def decode_body(request: Request):
+        try:
+            return decoder.decode(await request.body())
+        except msgspec.DecodeError as e:  # Also covers msgspec.ValidationError
+            raise RequestValidationError(msgspec_error_detail(e))
+
+    return decode_body
+
+def struct_openapi(struct_type: type) -> Dict[str, Any]:
+    """openapi_extra documenting a struct_body() request body (FastAPI can't see the Struct)"""
+    # The Struct's schema is inlined, so it must not reference other Structs
+    _, components = msgspec.json.schema_components((struct_type,))
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": components[struct_type.__name__]}}
+        }
+    }
+
 class TokenExchangeError(Exception):
     def __init__(self, message: str, status_code: int = 500):
         self.message = message
@@ -251,21 +842,11 @@ class TokenExchangeError(Exception):
         super().__init__(message)
 
 # Authentication helpers - using same logic as API
-def get_authorized_groups():
-    """Get authorized groups from environment - same as API"""
-    user_groups = os.getenv('AAD_AUTHORIZED_USER_GROUPS', '').split(',')
-    user_groups = [g.strip() for g in user_groups if g.strip()]
-
-    admin_groups = os.getenv('AAD_AUTHORIZED_ADMIN_GROUPS', '').split(',')
-    admin_groups = [g.strip() for g in admin_groups if g.strip()]
-
-    return user_groups, admin_groups
-
-def is_user_authorized(user_groups, required_groups):
+def is_user_authorized(user_groups, required_groups: frozenset):
     """Check if user is in authorized groups - same as API"""
     if not required_groups:
         return True
-    return any(group in required_groups for group in user_groups)
+    return not required_groups.isdisjoint(user_groups)
 
 def is_admin_user(user_groups, admin_groups):
     """Check if user is admin - same as API"""
@@ -278,39 +859,77 @@ async def fetch_user_mcp_access_policies(user_groups: List[str]) -> Dict[str, st
         access_map = {}
 
         # Use internal API key for service-to-service authentication
-        api_internal_key = os.environ.get('API_INTERNAL_KEY', '')
         headers = {
-            'Authorization': f'Bearer {api_internal_key}',
+            'Authorization': f'Bearer {API_INTERNAL_KEY}',
             'Content-Type': 'application/json'
         }
 
-        async with httpx.AsyncClient() as client:
-            for group_id in user_groups:
-                try:
-                    response = await client.get(
-                        f"{API_BASE_URL}/api/admin/mcp/access-summary/{group_id}",
-                        headers=headers,
-                        timeout=10.0
+        # Serve what we can from the Redis policy cache (one MGET for all groups)
+        access_summaries = {}
+        cached_summaries = [None] * len(user_groups)
+        if user_groups:
+            try:
+                cached_summaries = await redis_client.mget(
+                    [f"{ACCESS_POLICY_CACHE_PREFIX}{group_id}" for group_id in user_groups]
+                )
+            except Exception as e:
+                logger.warning(f"Access policy cache lookup failed: {e}")
+
+        missing_groups = []
+        for group_id, raw in zip(user_groups, cached_summaries):
+            if raw is not None:
+                access_summaries[group_id] = orjson.loads(raw)
+            else:
+                missing_groups.append(group_id)
+
+        # Query the remaining groups concurrently over the shared connection pool
+        responses = await asyncio.gather(
+            *(
+                http_client.get(
+                    f"{API_BASE_URL}/api/admin/mcp/access-summary/{group_id}",
+                    headers=headers,
+                    timeout=10.0
+                )
+                for group_id in missing_groups
+            ),
+            return_exceptions=True
+        )
+
+        for group_id, response in zip(missing_groups, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    access_summary = data.get('access_summary', [])
+                    access_summaries[group_id] = access_summary
+                    await redis_client.set(
+                        f"{ACCESS_POLICY_CACHE_PREFIX}{group_id}",
+                        orjson.dumps(access_summary),
+                        ex=ACCESS_POLICY_CACHE_TTL
                     )
 
-                    if response.status_code == 200:
-                        data = response.json()
-                        access_summary = data.get('access_summary', [])
+            except Exception as e:
+                logger.warning(f"Failed to fetch access policies for group {group_id}: {e}")
+                continue
 
-                        # Process access summary to build server access map
-                        for item in access_summary:
-                            server_id = item['server']['id']
-                            server_name = item['server']['name']
-                            access_type = item['access']  # 'allow' or 'deny'
+        for group_id in user_groups:
+            try:
+                # Process access summary to build server access map
+                for item in access_summaries.get(group_id, []):
+                    server_id = item['server']['id']
+                    server_name = item['server']['name']
+                    access_type = item['access']  # 'allow' or 'deny'
 
-                            # If we haven't seen this server yet, or if this is an allow policy
-                            # (allow policies override deny policies for better UX)
-                            if server_name not in access_map or access_type == 'allow':
-                                access_map[server_name] = access_type
+                    # If we haven't seen this server yet, or if this is an allow policy
+                    # (allow policies override deny policies for better UX)
+                    if server_name not in access_map or access_type == 'allow':
+                        access_map[server_name] = access_type
 
-                except Exception as e:
-                    logger.warning(f"Failed to fetch access policies for group {group_id}: {e}")
-                    continue
+            except Exception as e:
+                logger.warning(f"Failed to process access policies for group {group_id}: {e}")
+                continue
 
         logger.info(f"Fetched MCP access policies: {access_map}")
         return access_map
@@ -329,19 +948,17 @@ def check_server_access(server_name: str, user_groups: List[str], access_policie
     # Check explicit policies first
     if server_name in access_policies:
         access = access_policies[server_name]
-        logger.debug(f"Explicit policy for server '{server_name}': {access}")
+        logger.debug("Explicit policy for server '%s': %s", server_name, access)
         return access == 'allow'
 
     # For admin servers, deny access for non-admin users
-    # IMPORTANT: awp_admin and awp_kubernetes are admin-only servers
-    admin_servers = {'admin', 'awp_admin', 'awp_kubernetes'}
-    if server_name in admin_servers:
-        logger.debug(f"Denying access to admin server '{server_name}' for non-admin user")
+    if server_name in ADMIN_ONLY_SERVERS:
+        logger.debug("Denying access to admin server '%s' for non-admin user", server_name)
         return False
 
     # Default policy for other servers - allow access
     # This can be made configurable via MCPDefaultPolicy later
-    logger.debug(f"Using default policy for server '{server_name}': allow")
+    logger.debug("Using default policy for server '%s': allow", server_name)
     return True
 
 async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[Dict[str, Any]]:
@@ -395,62 +1012,40 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
         logger.info("AgenticWork user API key detected - validating against API")
         try:
             # Validate the API key by calling the AgenticWork API's /api/auth/me endpoint
-            api_internal_url = os.environ.get('API_INTERNAL_URL', 'http://agenticwork-api:8000')
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{api_internal_url}/api/auth/me",
-                    headers={'Authorization': f'Bearer {token}'}
-                )
-                if response.status_code == 200:
-                    user_data = response.json()
-                    logger.info(f"API key validated for user: {user_data.get('email', 'unknown')}")
-                    return {
-                        'token': token,  # Pass the original API key for OBO
-                        'payload': {},
-                        'user_id': user_data.get('userId', 'unknown'),
-                        'user_name': user_data.get('name') or user_data.get('email', 'API User'),
-                        'email': user_data.get('email', 'api-user@agenticwork.io'),
-                        'upn': None,
-                        'groups': user_data.get('groups', []),
-                        'is_admin': user_data.get('isAdmin', False)
-                    }
-                else:
-                    logger.warning(f"API key validation failed: {response.status_code}")
+            response = await http_client.get(
+                f"{API_INTERNAL_URL}/api/auth/me",
+                headers={'Authorization': f'Bearer {token}'},
+                timeout=IDENTITY_HTTP_TIMEOUT
+            )
+            if response.status_code == 200:
+                user_data = orjson.loads(response.content)
+                logger.info(f"API key validated for user: {user_data.get('email', 'unknown')}")
+                return {
+                    'token': token,  # Pass the original API key for OBO
+                    'payload': {},
+                    'user_id': user_data.get('userId', 'unknown'),
+                    'user_name': user_data.get('name') or user_data.get('email', 'API User'),
+                    'email': user_data.get('email', 'api-user@agenticwork.io'),
+                    'upn': None,
+                    'groups': user_data.get('groups', []),
+                    'is_admin': user_data.get('isAdmin', False)
+                }
+            else:
+                logger.warning(f"API key validation failed: {response.status_code}")
         except Exception as e:
             logger.error(f"Failed to validate API key: {e}")
         # Fall through to try other methods if validation fails
 
-    # Check for Flowise internal API key (service-to-service auth)
-    # This is used by Flowise to call MCP-proxy without requiring user JWT
-    flowise_api_key = os.environ.get('FLOWISE_INTERNAL_API_KEY', 'flowise-internal')
-    if token and token == flowise_api_key:
-        logger.info("Flowise internal API key detected - granting service account access with SP credentials")
-        return {
-            'token': 'SYSTEM_SP_AUTH',  # Use SP credentials for Azure calls
-            'payload': {},
-            'user_id': 'flowise-service',
-            'user_name': 'Flowise Service',
-            'email': 'flowise@agenticwork.io',
-            'upn': None,
-            'groups': ['service-accounts'],
-            'is_admin': True
-        }
+    # Check for internal service keys (Flowise, AgenticWork API)
+    service_account = STATIC_TOKENS.get(hashlib.blake2b(token.encode('utf-8'), digest_size=32).digest())
+    if service_account is not None:
+        logger.info(f"{service_account['user_name']} internal key detected - granting service account access with SP credentials")
+        return dict(service_account)
 
-    # Check for AgenticWork API internal key (raw key, not JWT)
-    # This is used by the agenticwork-api to call MCP-proxy for LLM tool execution
-    api_internal_key = os.environ.get('API_INTERNAL_KEY', '')
-    if token and token == api_internal_key:
-        logger.info("AgenticWork API internal key detected - granting service account access with SP credentials")
-        return {
-            'token': 'SYSTEM_SP_AUTH',  # Use SP credentials for Azure calls
-            'payload': {},
-            'user_id': 'api-service',
-            'user_name': 'AgenticWork API Service',
-            'email': 'api@agenticwork.io',
-            'upn': None,
-            'groups': ['service-accounts'],
-            'is_admin': True
-        }
+    # Token already validated (signature, issuer/audience, group checks) and not yet expired
+    cached_user_info = await get_cached_user_info(token)
+    if cached_user_info is not None:
+        return cached_user_info
 
     try:
         # Decode JWT header to determine token type
@@ -458,7 +1053,7 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
         alg = unverified_header.get('alg', 'RS256')
         kid = unverified_header.get('kid')
 
-        logger.info(f"[JWT-DEBUG] Token header: kid={kid}, alg={alg}, typ={unverified_header.get('typ')}")
+        logger.debug("[JWT-DEBUG] Token header: kid=%s, alg=%s, typ=%s", kid, alg, unverified_header.get('typ'))
 
         # =================================================================
         # INTERNAL JWT (HS256) - From AgenticWork API
@@ -466,22 +1061,18 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
         # Internal tokens are signed with HS256 and don't have a 'kid'
         # They contain user context (userId, email, isAdmin) from the API
         if alg == 'HS256' and not kid:
-            logger.info("[JWT-DEBUG] Detected internal HS256 token from API")
-
-            # Get shared secret for internal token validation
-            # MUST match API's JWT_SECRET/SIGNING_SECRET
-            internal_jwt_secret = os.environ.get('JWT_SECRET') or os.environ.get('SIGNING_SECRET') or os.environ.get('INTERNAL_JWT_SECRET', 'dev-secret-change-in-production')
+            logger.debug("[JWT-DEBUG] Detected internal HS256 token from API")
 
             try:
                 # Validate and decode internal token
                 payload = jwt.decode(
                     token,
-                    internal_jwt_secret,
+                    INTERNAL_JWT_SECRET,
                     algorithms=['HS256'],
                     options={'verify_aud': False, 'verify_iss': False}
                 )
 
-                logger.info(f"[JWT-DEBUG] Internal token validated successfully: userId={payload.get('userId')}")
+                logger.debug("[JWT-DEBUG] Internal token validated successfully: userId=%s", payload.get('userId'))
 
                 # Extract user context from internal token claims
                 user_id = payload.get('userId') or payload.get('user_id') or payload.get('sub')
@@ -490,11 +1081,13 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
                 is_admin = payload.get('isAdmin', False) or payload.get('is_admin', False)
                 user_groups = payload.get('groups', [])
 
+                logger.info("Authenticated user %s (internal token)", user_id)
+
                 # If admin flag is set, add to admin groups
                 if is_admin and 'system-admins' not in user_groups:
                     user_groups = list(user_groups) + ['system-admins']
 
-                return {
+                user_info = {
                     'token': token,
                     'payload': payload,
                     'user_id': user_id,
@@ -504,6 +1097,8 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
                     'groups': user_groups,
                     'is_admin': is_admin
                 }
+                await cache_user_info(token, user_info)
+                return user_info
 
             except jwt.ExpiredSignatureError:
                 logger.warning("[JWT-DEBUG] Internal token expired")
@@ -516,39 +1111,10 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
         # AZURE AD JWT (RS256) - From browser/Azure AD
         # =================================================================
         # Azure AD tokens are signed with RS256 and have a 'kid' for key lookup
-        logger.info("[JWT-DEBUG] Detected Azure AD RS256 token - validating against JWKS")
-
-        # Get Azure AD public keys for token validation
-        jwks_url = f"https://login.microsoftonline.com/{TENANT_ID}/discovery/v2.0/keys"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(jwks_url)
-            jwks = response.json()
-
-        logger.info(f"[JWT-DEBUG] JWKS has {len(jwks.get('keys', []))} keys")
-        logger.info(f"[JWT-DEBUG] JWKS key IDs: {[k.get('kid') for k in jwks.get('keys', [])]}")
-
-        # Find the correct key
-        rsa_key = {}
-        for key in jwks['keys']:
-            if key['kid'] == kid:
-                rsa_key = {
-                    'kty': key['kty'],
-                    'kid': key['kid'],
-                    'use': key['use'],
-                    'n': key['n'],
-                    'e': key['e']
-                }
-                logger.info(f"[JWT-DEBUG] Found matching key: kid={kid}")
-                break
+        logger.debug("[JWT-DEBUG] Detected Azure AD RS256 token - validating against JWKS")
 
-        if not rsa_key:
-            logger.error(f"[JWT-DEBUG] Unable to find key with kid={kid} in JWKS endpoint")
-            logger.error(f"[JWT-DEBUG] Token preview (first 50 chars): {token[:50]}...")
-            raise HTTPException(status_code=401, detail="Unable to find appropriate key")
-
-        # Convert to PEM format and verify token
-        from jwt.algorithms import RSAAlgorithm
-        public_key = RSAAlgorithm.from_jwk(rsa_key)
+        # Get Azure AD public key for token validation (cached JWKS)
+        public_key = await get_jwks_key(kid)
 
         # Azure AD can use different issuer formats (v1.0 vs v2.0)
         # Support both for compatibility
@@ -558,21 +1124,6 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
             f"https://login.microsoftonline.com/{TENANT_ID}/"       # Alternative v1.0 format
         ]
 
-        # First decode without validation to see the actual issuer and audience
-        try:
-            unverified_payload = jwt.decode(
-                token,
-                options={"verify_signature": False, "verify_aud": False, "verify_iss": False}
-            )
-            actual_issuer = unverified_payload.get('iss', 'unknown')
-            actual_audience = unverified_payload.get('aud', 'unknown')
-            logger.info(f"[JWT-DEBUG] Token issuer: {actual_issuer}")
-            logger.info(f"[JWT-DEBUG] Token audience: {actual_audience}")
-            logger.info(f"[JWT-DEBUG] Valid issuers: {valid_issuers}")
-        except Exception as e:
-            logger.warning(f"[JWT-DEBUG] Could not peek at token claims: {e}")
-            actual_audience = 'unknown'
-
         # Azure AD tokens can have different audience formats for OBO flow:
         # - CLIENT_ID directly (rare)
         # - api://{CLIENT_ID} (most common for OBO - the API's application ID URI)
@@ -583,55 +1134,55 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
             f"api://{CLIENT_ID}",                   # Application ID URI (most common for OBO)
             "https://management.azure.com",         # Azure ARM access token (from chat API)
         ]
-        logger.info(f"[JWT-DEBUG] Valid audiences: {valid_audiences}")
 
-        # Try to validate with each valid issuer and audience combination
-        payload = None
-        last_error = None
-        for issuer in valid_issuers:
-            for audience in valid_audiences:
-                try:
-                    payload = jwt.decode(
-                        token,
-                        public_key,
-                        algorithms=['RS256'],
-                        audience=audience,
-                        issuer=issuer
-                    )
-                    logger.info(f"[JWT-DEBUG] Token validated successfully with issuer: {issuer}, audience: {audience}")
-                    break
-                except jwt.InvalidIssuerError:
-                    last_error = f"Issuer mismatch for {issuer}, audience {audience}"
-                    continue
-                except jwt.InvalidAudienceError as e:
-                    last_error = f"Audience mismatch for {issuer}, audience {audience}: {str(e)}"
-                    continue
-                except Exception as e:
-                    last_error = f"Validation failed for {issuer}, audience {audience}: {str(e)}"
-                    continue
-            if payload is not None:
-                break  # Break outer loop if validated
+        # Peek at the (unverified) issuer and audience to pick the one combination to
+        # validate against, so the signature is verified exactly once
+        unverified_payload = jwt.decode(
+            token,
+            options={"verify_signature": False, "verify_aud": False, "verify_iss": False}
+        )
+        actual_issuer = unverified_payload.get('iss')
+        actual_audience = unverified_payload.get('aud')
+        logger.debug("[JWT-DEBUG] Token issuer: %s, audience: %s", actual_issuer, actual_audience)
 
-        if payload is None:
-            raise jwt.InvalidIssuerError(f"Token validation failed with all combinations. Actual issuer: {actual_issuer}, Actual audience: {actual_audience}, Expected issuers: {valid_issuers}, Expected audiences: {valid_audiences}. Last error: {last_error}")
+        chosen_iss = actual_issuer if actual_issuer in valid_issuers else None
+
+        if isinstance(actual_audience, list):
+            chosen_aud = next((aud for aud in actual_audience if aud in valid_audiences), None)
+        else:
+            chosen_aud = actual_audience if actual_audience in valid_audiences else None
+
+        if chosen_iss is None or chosen_aud is None:
+            logger.error(
+                f"Token issuer/audience not accepted. Actual issuer: {actual_issuer}, Actual audience: {actual_audience}, "
+                f"Expected issuers: {valid_issuers}, Expected audiences: {valid_audiences}"
+            )
+            raise HTTPException(status_code=401, detail="Token validation failed: issuer or audience not accepted")
+
+        payload = jwt.decode(
+            token,
+            public_key,
+            algorithms=['RS256'],
+            audience=chosen_aud,
+            issuer=chosen_iss
+        )
+        logger.debug("[JWT-DEBUG] Token validated successfully with issuer: %s, audience: %s", chosen_iss, chosen_aud)
+        logger.info("Authenticated user %s (Azure AD token)", payload.get('oid'))
 
         # Get user groups from token
         user_groups = payload.get('groups', [])
 
         # Check if user is authorized to access the system
-        authorized_user_groups, authorized_admin_groups = get_authorized_groups()
-        all_authorized_groups = list(set(authorized_user_groups + authorized_admin_groups))
-
-        if all_authorized_groups and not is_user_authorized(user_groups, all_authorized_groups):
+        if ALL_AUTHORIZED_GROUPS and not is_user_authorized(user_groups, ALL_AUTHORIZED_GROUPS):
             raise HTTPException(
                 status_code=403,
-                detail=f"Access denied. You must be a member of one of these groups: {', '.join(all_authorized_groups)}"
+                detail=f"Access denied. You must be a member of one of these groups: {', '.join(ALL_AUTHORIZED_GROUPS)}"
             )
 
         # Determine if user is admin
-        is_admin = is_admin_user(user_groups, authorized_admin_groups)
+        is_admin = is_admin_user(user_groups, AUTHORIZED_ADMIN_GROUPS)
 
-        return {
+        user_info = {
             'token': token,
             'payload': payload,
             'user_id': payload.get('oid'),
@@ -641,6 +1192,8 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
             'groups': user_groups,
             'is_admin': is_admin
         }
+        await cache_user_info(token, user_info)
+        return user_info
 
     except HTTPException:
         # Re-raise HTTP exceptions (like 403)
@@ -650,6 +1203,101 @@ async def get_user_info(credentials: HTTPAuthorizationCredentials = Depends(secu
         # Auth is always enabled - always raise on validation failure
         raise HTTPException(status_code=401, detail=f"Token validation failed: {str(e)}")
 
+async def refresh_jwks() -> None:
+    """Fetch Azure AD's JWKS and cache the parsed public key for each kid"""
+    jwks_url = f"https://login.microsoftonline.com/{TENANT_ID}/discovery/v2.0/keys"
+    response = await http_client.get(jwks_url, timeout=IDENTITY_HTTP_TIMEOUT)
+    response.raise_for_status()
+
+    keys = {}
+    for key in orjson.loads(response.content).get('keys', []):
+        try:
+            keys[key['kid']] = RSAAlgorithm.from_jwk(key)
+        except Exception as e:
+            logger.warning(f"Skipping unusable JWKS key {key.get('kid')}: {e}")
+
+    _jwks_cache["keys"] = keys
+    _jwks_cache["fetched_at"] = time.time()
+    logger.info(f"Refreshed Azure AD JWKS ({len(keys)} keys)")
+
+async def get_jwks_key(kid: Optional[str]) -> Any:
+    """Get the Azure AD public key for a token's kid, refreshing the JWKS cache when needed"""
+    age = time.time() - _jwks_cache["fetched_at"]
+    if kid in _jwks_cache["keys"] and age < JWKS_CACHE_TTL:
+        return _jwks_cache["keys"][kid]
+
+    async with _jwks_lock:
+        # Another request may have refreshed while we waited for the lock
+        age = time.time() - _jwks_cache["fetched_at"]
+        stale = age >= JWKS_CACHE_TTL
+        unknown_kid = kid not in _jwks_cache["keys"] and age >= JWKS_MIN_REFRESH_INTERVAL
+        if stale or unknown_kid:
+            await refresh_jwks()
+
+    public_key = _jwks_cache["keys"].get(kid)
+    if public_key is None:
+        logger.error(f"Unable to find key with kid={kid} in JWKS endpoint")
+        raise HTTPException(status_code=401, detail="Unable to find appropriate key")
+
+    return public_key
+
+def _user_info_cache_key(token: str) -> str:
+    """Redis key for a token's cached user info (keyed by digest, never the raw token)"""
+    return USER_INFO_CACHE_PREFIX + hashlib.blake2b(token.encode('utf-8'), digest_size=16).hexdigest()
+
+def _remember_user_info(cache_key: str, user_info: Dict[str, Any]) -> None:
+    """Keep validated user info in-process for USER_INFO_LOCAL_TTL (capped at the token's exp)"""
+    exp = user_info['payload'].get('exp')
+    if not exp:
+        return
+
+    if len(_user_info_local) >= USER_INFO_LOCAL_SIZE:
+        _user_info_local.pop(next(iter(_user_info_local)))  # Drop the oldest entry
+    _user_info_local[cache_key] = (min(time.time() + USER_INFO_LOCAL_TTL, exp), user_info)
+
+async def get_cached_user_info(token: str) -> Optional[Dict[str, Any]]:
+    """Get previously validated user info for a JWT, with the token re-attached"""
+    cache_key = _user_info_cache_key(token)
+
+    local = _user_info_local.get(cache_key)
+    if local:
+        if local[0] > time.time():
+            return dict(local[1])
+        del _user_info_local[cache_key]
+
+    try:
+        cached = await redis_client.get(cache_key)
+    except Exception as e:
+        logger.warning(f"User info cache lookup failed: {e}")
+        return None
+
+    if cached is None:
+        return None
+
+    user_info = orjson.loads(cached)
+    user_info['token'] = token
+    _remember_user_info(cache_key, user_info)
+    return dict(user_info)
+
+async def cache_user_info(token: str, user_info: Dict[str, Any]) -> None:
+    """Cache validated user info for a JWT until the token expires"""
+    exp = user_info['payload'].get('exp')
+    if not exp:
+        return
+
+    ttl = int(exp - time.time())
+    if ttl <= 0:
+        return
+
+    cache_key = _user_info_cache_key(token)
+    _remember_user_info(cache_key, dict(user_info))
+
+    try:
+        cached = {k: v for k, v in user_info.items() if k != 'token'}
+        await redis_client.set(cache_key, orjson.dumps(cached), ex=ttl)
+    except Exception as e:
+        logger.warning(f"Failed to cache user info: {e}")
+
 # OBO token exchange (for Azure MCP when user token is available)
 async def exchange_token_for_azure(original_token: str, scope: str = "https://management.azure.com/.default") -> str:
     """Exchange user token for Azure resource access using OBO flow"""
@@ -665,16 +1313,15 @@ async def exchange_token_for_azure(original_token: str, scope: str = "https://ma
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(obo_url, data=data)
+        response = await http_client.post(obo_url, data=data)
 
-            if response.status_code == 200:
-                token_response = response.json()
-                return token_response["access_token"]
-            else:
-                error_detail = response.text
-                logger.error(f"OBO token exchange failed: {error_detail}")
-                raise TokenExchangeError(f"Token exchange failed: {error_detail}", response.status_code)
+        if response.status_code == 200:
+            token_response = orjson.loads(response.content)
+            return token_response["access_token"]
+        else:
+            error_detail = response.text
+            logger.error(f"OBO token exchange failed: {error_detail}")
+            raise TokenExchangeError(f"Token exchange failed: {error_detail}", response.status_code)
 
     except httpx.RequestError as e:
         logger.error(f"Network error during token exchange: {e}")
@@ -683,13 +1330,123 @@ async def exchange_token_for_azure(original_token: str, scope: str = "https://ma
         logger.error(f"Unexpected error during token exchange: {e}")
         raise TokenExchangeError(f"Unexpected error: {str(e)}")
 
+def invalidate_tool_index() -> None:
+    """Force the next auto-detection to rebuild the tool index (servers or their tools changed)"""
+    global _tool_index_expires_at
+    _tool_index_expires_at = 0.0
+
+async def refresh_tool_index() -> None:
+    """Rebuild the tool -> server index by asking every running server for its tools concurrently"""
+    global _tool_index, _tool_index_expires_at
+
+    async def list_server_tools(server_name: str, server) -> List[Dict[str, Any]]:
+        try:
+            # Unique ID to avoid response collisions
+            response = await server.send_request({
+                "jsonrpc": "2.0",
+                "id": f"auto-detect-{uuid.uuid4().hex[:8]}",
+                "method": "tools/list"
+            })
+            if "result" in response and "tools" in response["result"]:
+                return response["result"]["tools"]
+        except Exception as e:
+            logger.debug(f"Could not list tools for server {server_name}: {e}")
+        return []
+
+    running = [(name, server) for name, server in mcp_manager.servers.items() if server.status == MCPServerStatus.RUNNING]
+    expires_at = time.monotonic() + TOOL_INDEX_TTL
+    results = await asyncio.gather(*(list_server_tools(name, server) for name, server in running))
+
+    index = {}
+    for (server_name, _), tools in zip(running, results):
+        for tool in tools:
+            index.setdefault(tool["name"], server_name)  # First server wins, as before
+
+    _tool_index = index
+    _tool_index_expires_at = expires_at
+    logger.info(f"Indexed {len(index)} tools across {len(running)} running servers")
+
+async def find_server_for_tool(tool_name: str) -> Optional[str]:
+    """Return the running server that provides tool_name, rebuilding the tool index when stale"""
+    if time.monotonic() >= _tool_index_expires_at:
+        async with _tool_index_lock:
+            # Another request may have rebuilt it while we waited
+            if time.monotonic() >= _tool_index_expires_at:
+                await refresh_tool_index()
+    return _tool_index.get(tool_name)
+
+async def _shared_route_request(key: tuple, target_server: str, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The downstream call behind a coalesced request"""
+    try:
+        return await mcp_manager.route_request(target_server, request_data)
+    finally:
+        # Removed as the call finishes, before waiters resume, so a later caller can't attach
+        # to an already finished call
+        _inflight_requests.pop(key, None)
+
+def _retrieve_task_exception(task: asyncio.Task) -> None:
+    # Marks the exception as retrieved even if every waiter was cancelled, so asyncio
+    # doesn't log "Task exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+async def route_request_coalesced(target_server: str, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Route a request, letting identical concurrent requests await the same downstream call
+
+    Only for requests without per-user data (no OBO token, no injected arguments).
+    """
+    key = (
+        target_server,
+        request_data["method"],
+        orjson.dumps(request_data["params"], option=orjson.OPT_SORT_KEYS, default=str)
+    )
+    task = _inflight_requests.get(key)
+    if task is None:
+        task = asyncio.create_task(_shared_route_request(key, target_server, request_data))
+        _inflight_requests[key] = task
+        task.add_done_callback(_retrieve_task_exception)
+    # Shielded so one caller disconnecting doesn't cancel the call for the others
+    response = await asyncio.shield(task)
+    # Each caller gets its own copy answering its own JSON-RPC id, so its response and MCP
+    # call log describe its request rather than whichever caller started the shared call
+    return {**response, "id": request_data["id"]}
+
+# Server name -> [monotonic time of the last warning, fallbacks since then]
+_obo_fallback_warnings: Dict[str, list] = {}
+
+def warn_missing_id_token(server_name: str) -> None:
+    """Warn (at most every OBO_FALLBACK_WARN_INTERVAL per server) that /call fell back to the access token for OBO"""
+    now = time.monotonic()
+    state = _obo_fallback_warnings.get(server_name)
+    if state is None:
+        if len(_obo_fallback_warnings) >= 512:
+            _obo_fallback_warnings.clear()
+        state = _obo_fallback_warnings[server_name] = [float("-inf"), 0]
+
+    state[1] += 1
+    if now - state[0] >= OBO_FALLBACK_WARN_INTERVAL:
+        logger.warning(
+            f"[OBO] No ID token provided for {server_name}, falling back to access token (may fail OBO) - "
+            f"{state[1]} fallback(s) since last logged"
+        )
+        state[0] = now
+        state[1] = 0
+
+# Server names with an "aws"/"azure" segment (awp_aws, awp_azure_cost, azure-mcp, ...) - not
+# names that merely contain the letters (azureus_tool)
+_OBO_SERVER_NAME = re.compile(r'(?:^|[_-])(?:aws|azure)(?:[_-]|$)', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=512)
+def server_needs_obo_id_token(server_name: str) -> bool:
+    """Whether /call should send a server the Azure AD ID token (AWS and Azure servers exchange it via OBO)"""
+    return _OBO_SERVER_NAME.search(server_name) is not None
+
 # === MAIN MCP ENDPOINTS ===
 
 @app.post("/mcp", response_model=MCPResponse)
 async def proxy_mcp_request(
     mcp_request: MCPRequest,
-    background_tasks: BackgroundTasks,
-    request: Request,
+    headers: MCPRequestHeaders = Depends(get_mcp_request_headers),
     user_info: Optional[Dict[str, Any]] = Depends(get_user_info)
 ):
     """Route MCP requests to appropriate server with comprehensive logging"""
@@ -708,29 +1465,9 @@ async def proxy_mcp_request(
         tool_name = mcp_request.params.get("name") if mcp_request.params else None
         if tool_name and mcp_manager:
             logger.warning(f"⚠️ API did not specify server for tool '{tool_name}' - attempting auto-detection (TEMPORARY WORKAROUND)")
-            # Try to find which server has this tool by querying all servers
-            from mcp_manager import MCPServerStatus
-            for server_name, server in mcp_manager.servers.items():
-                if server.status == MCPServerStatus.RUNNING:
-                    try:
-                        # Use send_request like list_all_tools() does
-                        # Use unique ID to avoid response collisions
-                        unique_id = f"auto-detect-{uuid.uuid4().hex[:8]}"
-                        request = {
-                            "jsonrpc": "2.0",
-                            "id": unique_id,
-                            "method": "tools/list"
-                        }
-                        response = await server.send_request(request)
-                        if "result" in response and "tools" in response["result"]:
-                            server_tools = [t["name"] for t in response["result"]["tools"]]
-                            if tool_name in server_tools:
-                                target_server = server_name
-                                logger.warning(f"🔍 Auto-detected server '{server_name}' for tool '{tool_name}' - API should have provided this!")
-                                break
-                    except Exception as e:
-                        logger.debug(f"Could not list tools for server {server_name}: {e}")
-                        continue
+            target_server = await find_server_for_tool(tool_name)
+            if target_server:
+                logger.warning(f"🔍 Auto-detected server '{target_server}' for tool '{tool_name}' - API should have provided this!")
 
     # CRITICAL: If no server specified at this point, the API didn't send it
     # This is an error - the API MUST specify which server to use
@@ -743,18 +1480,17 @@ async def proxy_mcp_request(
             detail=f"Server not specified for tool '{tool_name}'. The API must include server information in tool metadata."
         )
 
-    logger.info(f"=== MCP REQUEST ===")
     user_name = user_info.get('user_name', 'anonymous') if user_info else 'anonymous'
     is_admin = user_info.get('is_admin', False) if user_info else False
-    logger.info(f"User: {user_name} (admin: {is_admin})")
-    logger.info(f"Server: {target_server}")
-    logger.info(f"Method: {mcp_request.method}")
-    logger.info(f"Params: {json.dumps(mcp_request.params)}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("=== MCP REQUEST ===")
+        logger.info("User: %s (admin: %s)", user_name, is_admin)
+        logger.info("Server: %s", target_server)
+        logger.info("Method: %s", mcp_request.method)
+        logger.info("Params: %s", _LazyJson(mcp_request.params))
 
     # RBAC: Check if user can access this server
-    # IMPORTANT: awp_admin is the actual server name for admin tools
-    admin_servers = {'admin', 'awp_admin'}  # List of admin-only servers
-    if target_server in admin_servers and not is_admin:
+    if target_server in ADMIN_SERVERS and not is_admin:
         logger.warning(f"Access denied: Non-admin user '{user_name}' attempted to access admin server '{target_server}'")
         raise HTTPException(
             status_code=403,
@@ -763,6 +1499,12 @@ async def proxy_mcp_request(
 
     # Extract user_id (required for logging)
     user_id = user_info.get('user_id') if user_info else None
+    # Tool name recorded in the call log (success or error)
+    log_tool_name = (
+        mcp_request.params.get('name', 'unknown')
+        if mcp_request.method == 'tools/call' and mcp_request.params
+        else mcp_request.method
+    )
 
     try:
         # For MCP servers that support OBO (On-Behalf-Of), pass the ORIGINAL user token
@@ -770,16 +1512,13 @@ async def proxy_mcp_request(
         # This includes: awp_azure, awp_azure_cost, awp_flowise
         user_token = None
 
-        # Check if the target server supports OBO authentication
-        server_supports_obo = False
-        if mcp_manager and target_server in mcp_manager.servers:
-            server_supports_obo = mcp_manager.servers[target_server].config.supports_obo
-
-        if server_supports_obo and user_info and ENABLE_AUTH:
+        # Check if the target server supports OBO authentication - the cheap module flags are
+        # tested first so non-OBO requests never look up the server or touch the headers
+        target = mcp_manager.servers.get(target_server) if ENABLE_AUTH and user_info else None
+        if target is not None and target.config.supports_obo:
             # Check if configured for shared SP mode (bypasses OBO)
-            use_shared_sp = os.getenv("AZURE_MCP_USE_SHARED_SP", "false").lower() == "true"
-
-            if not use_shared_sp and user_info.get('token') and user_info.get('token') != 'SYSTEM_SP_AUTH':
+            caller_token = user_info.get('token')
+            if not AZURE_MCP_USE_SHARED_SP and caller_token and caller_token != 'SYSTEM_SP_AUTH':
                 # CRITICAL: For OBO (On-Behalf-Of) flow, the assertion token MUST have
                 # audience = app's client ID. The OnBehalfOfCredential then exchanges
                 # this for a token with the target resource audience.
@@ -789,46 +1528,50 @@ async def proxy_mcp_request(
                 #
                 # Both AWS and Azure MCP servers need the ID token for OBO!
                 # API sends X-Azure-ID-Token for all OBO scenarios (Azure AD ID token)
-                id_token = request.headers.get('X-Azure-ID-Token')
+                id_token = headers.id_token
 
                 if id_token:
                     user_token = id_token
-                    logger.info(f"Using ID token for {target_server} OBO (audience=app client ID): {user_info.get('user_name')}")
+                    logger.info("Using ID token for %s OBO (audience=app client ID): %s", target_server, user_info.get('user_name'))
                 else:
                     # Fall back to access token - this may fail for OBO if audience is wrong
-                    user_token = user_info['token']
+                    user_token = caller_token
                     logger.warning(f"No ID token provided for {target_server}, using access token (OBO may fail if audience mismatch)")
             else:
-                logger.info(f"MCP server {target_server} configured for shared SP mode - no user token passed")
+                logger.info("MCP server %s configured for shared SP mode - no user token passed", target_server)
 
         # CRITICAL: Inject user_id into tool arguments for servers that require user isolation
         # The awp-agenticwork-cli-mcp server needs user_id for RBAC and workspace isolation
         params_to_send = mcp_request.params
-        if mcp_request.method == 'tools/call' and user_id:
-            # Check if this is a server that needs user_id injection
-            servers_needing_user_id = ['awp_agenticwork_cli', 'awp_agenticode']
-            if target_server in servers_needing_user_id:
-                # Clone params and inject user_id into arguments
-                params_to_send = dict(mcp_request.params) if mcp_request.params else {}
-                if 'arguments' in params_to_send:
-                    args = dict(params_to_send['arguments']) if params_to_send['arguments'] else {}
-                    # Only inject if user_id is not already set or is "default"
-                    if not args.get('user_id') or args.get('user_id') == 'default':
-                        args['user_id'] = user_id
-                        params_to_send['arguments'] = args
-                        logger.info(f"[MCP] Injected user_id={user_id} into {target_server} tool arguments")
-
-                    # Also inject api_key for serverless tools that require it
-                    # These tools call back to the platform API and need authentication
-                    tool_name = params_to_send.get('name', '')
-                    serverless_tools = ['run_agenticode_task', 'run_code_generation', 'run_file_operation']
-                    if tool_name in serverless_tools and not args.get('api_key'):
-                        # Get API key from request header if available
-                        api_key = request.headers.get('X-Api-Key') or request.headers.get('Authorization', '').replace('Bearer ', '')
-                        if api_key and api_key.startswith('awc_'):
-                            args['api_key'] = api_key
-                            params_to_send['arguments'] = args
-                            logger.info(f"[MCP] Injected api_key into {tool_name} for user {user_id}")
+        if (
+            mcp_request.method == 'tools/call' and user_id
+            and target_server in USER_ID_INJECTION_SERVERS
+            and 'arguments' in params_to_send
+        ):
+            args = params_to_send['arguments'] or {}
+            injected = {}
+
+            # Only inject if user_id is not already set or is "default"
+            if not args.get('user_id') or args.get('user_id') == 'default':
+                injected['user_id'] = user_id
+                logger.info("[MCP] Injected user_id=%s into %s tool arguments", user_id, target_server)
+
+            # Also inject api_key for serverless tools that require it
+            # These tools call back to the platform API and need authentication
+            tool_name = params_to_send.get('name', '')
+            if tool_name in SERVERLESS_TOOLS and not args.get('api_key'):
+                # Get API key from request header if available
+                api_key = headers.api_key
+                if not api_key:
+                    authorization = headers.authorization or ''
+                    api_key = authorization[7:] if authorization.startswith('Bearer ') else authorization
+                if api_key and api_key.startswith('awc_'):
+                    injected['api_key'] = api_key
+                    logger.info("[MCP] Injected api_key into %s for user %s", tool_name, user_id)
+
+            if injected:
+                # One copy of params/arguments with the final values - the request model is left untouched
+                params_to_send = {**params_to_send, 'arguments': {**args, **injected}}
 
         # Route request to MCP server
         request_data = {
@@ -838,26 +1581,37 @@ async def proxy_mcp_request(
             "params": params_to_send
         }
 
-        result = await mcp_manager.route_request(target_server, request_data, user_token)
+        coalesce = (
+            user_token is None
+            and params_to_send is mcp_request.params  # Nothing user-specific injected
+            and (
+                mcp_request.method in COALESCED_METHODS
+                or (mcp_request.method == 'tools/call' and headers.coalesce)
+            )
+        )
+        if coalesce:
+            result = await route_request_coalesced(target_server, request_data)
+        else:
+            result = await mcp_manager.route_request(target_server, request_data, user_token)
 
         execution_time = time.time() - start_time
         execution_time_ms = execution_time * 1000
 
-        logger.info(f"=== MCP RESPONSE ===")
-        logger.info(f"Server: {target_server}")
-        logger.info(f"Execution Time: {execution_time:.3f}s")
-        logger.info(f"Result: {json.dumps(result)}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("=== MCP RESPONSE ===")
+            logger.info("Server: %s", target_server)
+            logger.info("Execution Time: %.3fs", execution_time)
+            # Full tool output can be large - only serialized if a handler formats the record
+            logger.info("Result: %s", _LazyJson(result))
 
-        # Send log to API (background task, non-blocking) with full user info and response
+        # Queue log for the API (non-blocking) with full user info and response
         if user_id:
-            tool_name = mcp_request.params.get('name', 'unknown') if mcp_request.method == 'tools/call' else mcp_request.method
-            background_tasks.add_task(
-                send_mcp_log_to_api,
+            send_mcp_log_to_api(
                 user_id=user_id,
                 user_name=user_info.get('user_name') if user_info else None,
                 user_email=user_info.get('user_email') if user_info else None,
                 server_name=target_server,
-                tool_name=tool_name,
+                tool_name=log_tool_name,
                 method=mcp_request.method,
                 params=mcp_request.params,
                 result=result.get('result'),  # Full response data
@@ -874,25 +1628,28 @@ async def proxy_mcp_request(
             execution_time=execution_time
         )
 
+    except MCPServerBusyError as e:
+        # Shed load instead of queueing behind a saturated server
+        logger.warning("%s - rejecting request", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
     except Exception as e:
         execution_time = time.time() - start_time
         execution_time_ms = execution_time * 1000
 
-        logger.error(f"=== MCP ERROR ===")
-        logger.error(f"Server: {target_server}")
-        logger.error(f"Error: {str(e)}")
-        logger.error(f"Execution Time: {execution_time:.3f}s")
+        logger.error("=== MCP ERROR ===")
+        logger.error("Server: %s", target_server)
+        logger.error("Error: %s", e)
+        logger.error("Execution Time: %.3fs", execution_time)
 
-        # Send error log to API (background task, non-blocking) with full user info
+        # Queue error log for the API (non-blocking) with full user info
         if user_id:
-            tool_name = mcp_request.params.get('name', 'unknown') if mcp_request.method == 'tools/call' else mcp_request.method
-            background_tasks.add_task(
-                send_mcp_log_to_api,
+            send_mcp_log_to_api(
                 user_id=user_id,
                 user_name=user_info.get('user_name') if user_info else None,
                 user_email=user_info.get('user_email') if user_info else None,
                 server_name=target_server,
-                tool_name=tool_name,
+                tool_name=log_tool_name,
                 method=mcp_request.method,
                 params=mcp_request.params,
                 result=None,
@@ -914,13 +1671,13 @@ async def proxy_mcp_request(
 @app.post("/mcp/tool", response_model=MCPResponse)
 async def call_mcp_tool(
     tool_call: MCPToolCall,
-    background_tasks: BackgroundTasks,
-    request: Request,
+    headers: MCPRequestHeaders = Depends(get_mcp_request_headers),
     user_info: Optional[Dict[str, Any]] = Depends(get_user_info)
 ):
     """Call a specific tool on an MCP server"""
 
-    mcp_request = MCPRequest(
+    # tool_call was already validated - build the forwarded request without re-validating
+    mcp_request = MCPRequest.model_construct(
         method="tools/call",
         params={
             "name": tool_call.tool,
@@ -930,7 +1687,7 @@ async def call_mcp_tool(
         server=tool_call.server
     )
 
-    return await proxy_mcp_request(mcp_request, background_tasks, request, user_info)
+    return await proxy_mcp_request(mcp_request, headers, user_info)
 
 # === STATUS AND MONITORING ENDPOINTS ===
 
@@ -979,6 +1736,7 @@ async def add_server(config: Dict[str, Any]):
     try:
         # Validation is now done in mcp_manager.add_server() which handles both formats
         result = await mcp_manager.add_server(config)
+        invalidate_tool_index()
         logger.info(f"Added new MCP server: {result.get('name', 'unknown')}")
         return {"success": True, "server": result}
     except ValueError as e:
@@ -997,6 +1755,7 @@ async def start_server(server_id: str):
 
     try:
         await mcp_manager.start_server(server_id)
+        invalidate_tool_index()
         logger.info(f"Started MCP server: {server_id}")
         return {"success": True, "message": f"Server {server_id} started"}
     except Exception as e:
@@ -1011,6 +1770,7 @@ async def stop_server(server_id: str):
 
     try:
         await mcp_manager.stop_server(server_id)
+        invalidate_tool_index()
         logger.info(f"Stopped MCP server: {server_id}")
         return {"success": True, "message": f"Server {server_id} stopped"}
     except Exception as e:
@@ -1025,6 +1785,7 @@ async def restart_server(server_id: str):
 
     try:
         await mcp_manager.restart_server(server_id)
+        invalidate_tool_index()
         logger.info(f"Restarted MCP server: {server_id}")
         return {"success": True, "message": f"Server {server_id} restarted"}
     except Exception as e:
@@ -1039,6 +1800,7 @@ async def delete_server(server_id: str):
 
     try:
         await mcp_manager.delete_server(server_id)
+        invalidate_tool_index()
         logger.info(f"Deleted MCP server: {server_id}")
         return {"success": True, "message": f"Server {server_id} deleted"}
     except Exception as e:
@@ -1079,6 +1841,7 @@ async def set_server_enabled(
 
     try:
         result = await mcp_manager.set_server_enabled(server_id, request.enabled)
+        invalidate_tool_index()
         logger.info(f"Server {server_id} enabled={request.enabled} by {user_info.get('user_name', 'unknown')}")
         return {"success": True, **result}
     except ValueError as e:
@@ -1111,8 +1874,16 @@ async def list_servers_enabled():
         "servers": mcp_manager.list_server_enabled_states()
     }
 
-async def _list_all_tools_impl(user_info: Optional[Dict[str, Any]] = None):
-    """Internal implementation for listing all tools with RBAC filtering"""
+async def _list_all_tools_impl(
+    user_info: Optional[Dict[str, Any]] = None,
+    format: Optional[str] = None,
+    flat: bool = False
+):
+    """Internal implementation for listing all tools with RBAC filtering
+
+    format="ndjson" streams one JSON line per tool followed by a summary line;
+    flat=True leaves out the by_server copy of the tool list.
+    """
     if not mcp_manager:
         raise HTTPException(status_code=503, detail="MCP Manager not initialized")
 
@@ -1138,42 +1909,63 @@ async def _list_all_tools_impl(user_info: Optional[Dict[str, Any]] = None):
         else:
             logger.info(f"Filtering server '{server_name}' for user: {user_name}")
 
+    total_count = sum(len(tools) for tools in filtered_tools.values())
+    logger.info(f"Found {total_count} tools across {len(filtered_tools)} servers for user: {user_name}")
+
+    metadata = {
+        "user": user_name,
+        "is_admin": is_admin,
+        "groups": user_groups,
+        "access_policies_applied": len(access_policies),
+        "total_servers_available": len(all_tools),
+        "total_servers_accessible": len(filtered_tools)
+    }
+
+    if format == "ndjson":
+        async def ndjson_lines():
+            for server_name, tools in filtered_tools.items():
+                for tool in tools:
+                    yield orjson.dumps({"server": server_name, **tool}) + b"\n"
+            yield orjson.dumps({
+                "total_count": total_count,
+                "server_count": len(filtered_tools),
+                "metadata": metadata
+            }) + b"\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
     # Flatten into a single list with server attribution
     tools_list = []
     for server_name, tools in filtered_tools.items():
-        for tool in tools:
-            tool_info = {
-                "server": server_name,
-                **tool
-            }
-            tools_list.append(tool_info)
-
-    logger.info(f"Found {len(tools_list)} tools across {len(filtered_tools)} servers for user: {user_name}")
+        tools_list.extend({"server": server_name, **tool} for tool in tools)
 
-    return {
+    response = {
         "tools": tools_list,
-        "by_server": filtered_tools,
-        "total_count": len(tools_list),
+        "total_count": total_count,
         "server_count": len(filtered_tools),
-        "metadata": {
-            "user": user_name,
-            "is_admin": is_admin,
-            "groups": user_groups,
-            "access_policies_applied": len(access_policies),
-            "total_servers_available": len(all_tools),
-            "total_servers_accessible": len(filtered_tools)
-        }
+        "metadata": metadata
     }
+    if not flat:
+        response["by_server"] = filtered_tools
+    return response
 
 @app.get("/tools")
-async def list_all_tools(user_info: Optional[Dict[str, Any]] = Depends(get_user_info)):
-    """List all tools from all running MCP servers"""
-    return await _list_all_tools_impl(user_info)
+async def list_all_tools(
+    format: Optional[str] = None,
+    flat: bool = False,
+    user_info: Optional[Dict[str, Any]] = Depends(get_user_info)
+):
+    """List all tools from all running MCP servers (?format=ndjson to stream, ?flat=1 to skip by_server)"""
+    return await _list_all_tools_impl(user_info, format, flat)
 
 @app.get("/v1/mcp/tools")
-async def list_all_tools_v1(user_info: Optional[Dict[str, Any]] = Depends(get_user_info)):
+async def list_all_tools_v1(
+    format: Optional[str] = None,
+    flat: bool = False,
+    user_info: Optional[Dict[str, Any]] = Depends(get_user_info)
+):
     """List all tools from all running MCP servers (OpenAI-compatible endpoint)"""
-    return await _list_all_tools_impl(user_info)
+    return await _list_all_tools_impl(user_info, format, flat)
 
 @app.get("/servers/{server_name}/tools")
 async def list_server_tools(server_name: str, user_info: Optional[Dict[str, Any]] = Depends(get_user_info)):
@@ -1284,7 +2076,7 @@ async def auth_login():
             raise HTTPException(status_code=500, detail="OAuth service not initialized")
 
         # Generate auth URL with PKCE
-        auth_data = oauth_service.generate_auth_url()
+        auth_data = await oauth_service.generate_auth_url()
 
         # Redirect user to Azure AD login
         return RedirectResponse(url=auth_data["auth_url"])
@@ -1310,13 +2102,13 @@ async def auth_callback(code: Optional[str] = None, state: Optional[str] = None,
             raise HTTPException(status_code=500, detail="OAuth service not initialized")
 
         # Exchange code for tokens
-        tokens = oauth_service.exchange_code_for_token(code, state)
+        tokens = await oauth_service.exchange_code_for_token(code, state)
 
         # Extract user info from tokens
         user_info = oauth_service.extract_user_info(tokens)
 
         # Create session
-        session_id = oauth_service.create_session(user_info)
+        session_id = await oauth_service.create_session(user_info)
 
         # Automatically start per-user Azure MCP session
         session_manager = get_user_session_manager()
@@ -1358,7 +2150,7 @@ async def auth_me(mcp_session: Optional[str] = Cookie(None)):
         if not oauth_service:
             raise HTTPException(status_code=500, detail="OAuth service not initialized")
 
-        session_data = oauth_service.get_session(mcp_session)
+        session_data = await oauth_service.get_session(mcp_session)
 
         if not session_data:
             raise HTTPException(status_code=401, detail="Invalid or expired session")
@@ -1382,18 +2174,16 @@ async def auth_logout(response: Response, mcp_session: Optional[str] = Cookie(No
     """Logout and destroy session"""
     try:
         if mcp_session and oauth_service:
-            # Stop user's Azure MCP session
-            if oauth_service.get_session(mcp_session):
-                session_data = oauth_service.get_session(mcp_session)
-                user_id = session_data.get("user_id")
+            # Stop user's Azure MCP session (only user_id is needed, so HGET that field)
+            user_id = await oauth_service.get_session_field(mcp_session, "user_id")
 
-                if user_id:
-                    session_manager = get_user_session_manager()
-                    await session_manager.stop_user_session(user_id)
-                    logger.info(f"Stopped Azure MCP session for user {user_id}")
+            if user_id:
+                session_manager = get_user_session_manager()
+                await session_manager.stop_user_session(user_id)
+                logger.info(f"Stopped Azure MCP session for user {user_id}")
 
             # Delete OAuth session
-            oauth_service.delete_session(mcp_session)
+            await oauth_service.delete_session(mcp_session)
 
         # Clear cookie
         response.delete_cookie("mcp_session")
@@ -1439,15 +2229,15 @@ async def create_manual_session(request: ManualSessionRequest):
 
 # === MCP TOOL EXECUTION ===
 
-class MCPCallRequest(BaseModel):
+class MCPCallRequest(msgspec.Struct):
     server: str
     tool: str
     arguments: Dict[str, Any] = {}
 
-@app.post("/call")
+@app.post("/call", openapi_extra=struct_openapi(MCPCallRequest))
 async def call_mcp_tool(
-    call_request: MCPCallRequest,
-    http_request: Request,
+    call_request: MCPCallRequest = Depends(struct_body(MCPCallRequest)),
+    id_token: Optional[str] = Header(default=None, alias="X-Azure-ID-Token"),
     user_info: Optional[Dict[str, Any]] = Depends(get_user_info)
 ):
     """
@@ -1458,24 +2248,12 @@ async def call_mcp_tool(
         if not mcp_manager:
             raise HTTPException(status_code=503, detail="MCP Manager not initialized")
 
-        # Create MCP request for tools/call
-        mcp_request = MCPRequest(
-            server=call_request.server,
-            method="tools/call",
-            params={
-                "name": call_request.tool,
-                "arguments": call_request.arguments
-            }
-        )
-
         # Check RBAC
         user_name = user_info.get('user_name', 'anonymous') if user_info else 'anonymous'
         is_admin = user_info.get('is_admin', False) if user_info else False
 
         # Admin-only servers
-        # IMPORTANT: awp_admin is the actual server name for admin tools
-        admin_servers = {'admin', 'awp_admin'}
-        if call_request.server in admin_servers and not is_admin:
+        if call_request.server in ADMIN_SERVERS and not is_admin:
             raise HTTPException(
                 status_code=403,
                 detail=f"Access denied. Admin privileges required to access '{call_request.server}' server."
@@ -1485,8 +2263,11 @@ async def call_mcp_tool(
         request_data = {
             "jsonrpc": "2.0",
             "id": 1,
-            "method": mcp_request.method,
-            "params": mcp_request.params
+            "method": "tools/call",
+            "params": {
+                "name": call_request.tool,
+                "arguments": call_request.arguments
+            }
         }
 
         # CRITICAL: Pass user's token for OBO authentication
@@ -1496,24 +2277,22 @@ async def call_mcp_tool(
         user_token = None
         if user_info and user_info.get('token') and user_info.get('token') != 'SYSTEM_SP_AUTH':
             # For OBO-enabled servers (Azure, AWS), use the ID token if available
-            # The ID token has the app's client ID as audience, required for OBO exchange
-            id_token = http_request.headers.get('X-Azure-ID-Token')
-
-            if 'aws' in call_request.server.lower() or 'azure' in call_request.server.lower():
+            # The ID token (X-Azure-ID-Token) has the app's client ID as audience, required for OBO exchange
+            if server_needs_obo_id_token(call_request.server):
                 # AWS and Azure servers need the ID token for OBO
                 if id_token:
                     user_token = id_token
-                    logger.info(f"[OBO] Using ID token for {call_request.server} OBO: {user_name}")
+                    logger.debug("[OBO] Using ID token for %s OBO: %s", call_request.server, user_name)
                 else:
                     # Fall back to access token if no ID token provided
                     user_token = user_info['token']
-                    logger.warning(f"[OBO] No ID token provided for {call_request.server}, falling back to access token (may fail OBO)")
+                    warn_missing_id_token(call_request.server)
             else:
                 # Non-OBO servers use the access token
                 user_token = user_info['token']
-                logger.info(f"[OBO] Passing access token to {call_request.server}: {user_name}")
+                logger.debug("[OBO] Passing access token to %s: %s", call_request.server, user_name)
         else:
-            logger.debug(f"No user token available for {call_request.server} - will use fallback credentials")
+            logger.debug("No user token available for %s - will use fallback credentials", call_request.server)
 
         result = await mcp_manager.route_request(call_request.server, request_data, user_token)
 
@@ -1534,14 +2313,142 @@ async def call_mcp_tool(
 # Proxies to the API's /api/embeddings endpoint which uses UniversalEmbeddingService
 # This supports all configured embedding providers (Azure, AWS, Ollama, Vertex AI, etc.)
 
-class EmbeddingRequest(BaseModel):
-    model: Optional[str] = None
+class EmbeddingRequest(msgspec.Struct):
     input: Union[str, List[str]]
+    model: Optional[str] = None
     encoding_format: Optional[str] = None
     dimensions: Optional[int] = None
 
-@app.post("/v1/embeddings")
-async def create_embeddings(request: EmbeddingRequest):
+def _embedding_cache_keys(request: EmbeddingRequest, inputs: List[str]) -> List[str]:
+    """Redis keys for each input's cached vector - same text and options map to the same key"""
+    options = f"{request.model or ''}\x00{request.dimensions or ''}\x00{request.encoding_format or ''}\x00"
+    return [
+        EMBEDDINGS_CACHE_PREFIX + hashlib.blake2b((options + text).encode('utf-8'), digest_size=16).hexdigest()
+        for text in inputs
+    ]
+
+async def fetch_embeddings(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a payload to the API's embeddings endpoint and return its (OpenAI-shaped) response"""
+    # Serialized with orjson (straight to UTF-8 bytes) before taking a concurrency slot
+    body = orjson.dumps(payload)
+
+    # Shared pooled client - embedding generation can take longer than its default timeout
+    started = await embeddings_limiter.acquire()
+    try:
+        response = await http_client.post(
+            EMBEDDINGS_URL,
+            content=body,
+            headers={'Content-Type': 'application/json'},
+            timeout=60.0
+        )
+    except httpx.ConnectError:
+        embeddings_limiter.release(started)
+        raise
+    except httpx.TimeoutException:
+        embeddings_limiter.release(started, 504)
+        raise
+    except BaseException:
+        embeddings_limiter.discard()
+        raise
+    embeddings_limiter.release(started, response.status_code, response.headers)
+
+    if response.status_code != 200:
+        logger.error(f"API embeddings error: {response.status_code} - {response.text}")
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Embedding generation failed: {response.text}"
+        )
+
+    # Vectors are thousands of floats per input - parse with orjson rather than stdlib json
+    return orjson.loads(response.content)
+
+class EmbeddingBatcher:
+    """
+    Coalesces embedding inputs submitted within EMBEDDINGS_BATCH_WAIT_MS of each other (per
+    model/dimensions/encoding options) into one upstream request of up to EMBEDDINGS_BATCH_SIZE
+    inputs. Each submitted input gets a future resolving to (model, embedding, usage).
+
+    Upstream usage can only be attributed when every input in the batch came from the same
+    request (owner): the first input of such a batch carries the batch's usage and the rest
+    carry {}. Inputs of a batch shared between requests carry None.
+    """
+    __slots__ = ("_pending", "_timers", "_tasks")
+
+    def __init__(self):
+        self._pending: Dict[tuple, list] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+
+    @property
+    def pending(self) -> int:
+        """Inputs waiting for a batch to fill plus batches being sent"""
+        return sum(len(batch) for batch in self._pending.values()) + len(self._tasks)
+
+    def flush_all(self) -> None:
+        """Send every partially filled batch now (shutdown)"""
+        for options in list(self._pending):
+            self._flush(options)
+
+    def submit(self, options: tuple, text: str, owner: object) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(options, [])
+        batch.append((text, future, owner))
+        if len(batch) >= EMBEDDINGS_BATCH_SIZE:
+            self._flush(options)
+        elif len(batch) == 1:
+            self._timers[options] = loop.call_later(EMBEDDINGS_BATCH_WAIT_MS / 1000, self._flush, options)
+        return future
+
+    def _flush(self, options: tuple) -> None:
+        timer = self._timers.pop(options, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(options, None)
+        if batch:
+            task = asyncio.create_task(self._send(options, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, options: tuple, batch: list) -> None:
+        model, dimensions, encoding_format = options
+        texts = [text for text, _, _ in batch]
+        payload = {'input': texts[0] if len(texts) == 1 else texts}
+        if model:
+            payload['model'] = model
+        if encoding_format:
+            payload['encoding_format'] = encoding_format
+        if dimensions:
+            payload['dimensions'] = dimensions
+
+        try:
+            result = await fetch_embeddings(payload)
+            if len(batch) > 1:
+                logger.debug("[EMBEDDINGS] Sent a batch of %d inputs upstream", len(batch))
+
+            # Usage is reported per upstream request - it can't be split between callers
+            exclusive = all(owner is batch[0][2] for _, _, owner in batch)
+            usage = (result.get('usage') or {}) if exclusive else None
+            result_model = result.get('model', model)
+            for item in result['data']:
+                index = item['index']
+                future = batch[index][1]
+                if not future.done():  # The caller may have been cancelled meanwhile
+                    future.set_result((result_model, item['embedding'], usage if index == 0 or usage is None else {}))
+            missing = RuntimeError("Embedding response is missing inputs")
+        except BaseException as e:
+            missing = e
+
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(missing)
+        if isinstance(missing, asyncio.CancelledError):
+            raise missing
+
+embedding_batcher = EmbeddingBatcher()
+
+@app.post("/v1/embeddings", openapi_extra=struct_openapi(EmbeddingRequest))
+async def create_embeddings(request: EmbeddingRequest = Depends(struct_body(EmbeddingRequest))):
     """
     Generate embeddings by proxying to API's UniversalEmbeddingService.
 
@@ -1551,41 +2458,94 @@ async def create_embeddings(request: EmbeddingRequest):
 
     No hardcoded models or providers here - all configuration comes from
     the API's UniversalEmbeddingService.
+
+    Vectors are cached in Redis per input, so only inputs not embedded before
+    (with the same options) are sent upstream; usage counts only those. Those
+    inputs are micro-batched with other concurrent requests' (EmbeddingBatcher);
+    when they shared an upstream request with another caller, its usage can't be
+    attributed and is omitted from the response.
     """
     try:
-        # Get API endpoint from environment (configurable)
-        api_base_url = os.getenv('AGENTICWORK_API_URL', 'http://agenticworkchat-api:8000')
-        embeddings_url = f"{api_base_url}/api/embeddings"
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # Build request payload
-            payload = {'input': request.input}
-            if request.model:
-                payload['model'] = request.model
-            if request.encoding_format:
-                payload['encoding_format'] = request.encoding_format
-            if request.dimensions:
-                payload['dimensions'] = request.dimensions
-
-            response = await client.post(
-                embeddings_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'}
-            )
-
-            if response.status_code != 200:
-                logger.error(f"API embeddings error: {response.status_code} - {response.text}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Embedding generation failed: {response.text}"
-                )
+        inputs = [request.input] if isinstance(request.input, str) else request.input
+        if not any(text.strip() for text in inputs):
+            raise HTTPException(status_code=400, detail="input is empty")
+
+        # Each distinct text is looked up and embedded once; duplicates share its vector
+        unique_inputs = list(dict.fromkeys(inputs))
+        vectors: List[Optional[orjson.Fragment]] = [None] * len(unique_inputs)
+
+        cache_keys = None
+        cached = [None] * len(unique_inputs)
+        if EMBEDDINGS_CACHE_TTL > 0:
+            cache_keys = _embedding_cache_keys(request, unique_inputs)
+            try:
+                cached = await redis_client.mget(cache_keys)
+            except Exception as e:
+                logger.warning(f"Embeddings cache lookup failed: {e}")
+
+        misses = []
+        model = request.model
+        for u, entry in enumerate(cached):
+            if entry is None:
+                misses.append(u)
+            else:
+                cached_model, _, embedding_json = entry.partition(b'\0')
+                model = cached_model.decode('utf-8') or model
+                vectors[u] = orjson.Fragment(embedding_json)
+        usage = {'prompt_tokens': 0, 'total_tokens': 0}
+
+        if misses:
+            # Embed the inputs not in the cache, batched with other concurrent requests
+            options = (request.model, request.dimensions, request.encoding_format)
+            owner = object()
+            results = await asyncio.gather(*(embedding_batcher.submit(options, unique_inputs[u], owner) for u in misses))
+
+            pipe = redis_client.pipeline(transaction=False) if cache_keys else None
+            for u, (model, embedding, batch_usage) in zip(misses, results):
+                # Encode each vector once - the same bytes go to the cache and into the response
+                embedding_json = orjson.dumps(embedding)
+                vectors[u] = orjson.Fragment(embedding_json)
+                if batch_usage is None:
+                    usage = None
+                elif usage is not None:
+                    usage['prompt_tokens'] += batch_usage.get('prompt_tokens', 0)
+                    usage['total_tokens'] += batch_usage.get('total_tokens', 0)
+                if pipe is not None:
+                    pipe.set(cache_keys[u], (model or '').encode('utf-8') + b'\0' + embedding_json, ex=EMBEDDINGS_CACHE_TTL)
+            if pipe is not None:
+                try:
+                    await pipe.execute()
+                except Exception as e:
+                    logger.warning(f"Failed to cache embeddings: {e}")
+        else:
+            logger.debug("[EMBEDDINGS] All %d input(s) served from cache", len(inputs))
 
-            return response.json()
+        if len(unique_inputs) == len(inputs):
+            data = [{'object': 'embedding', 'embedding': vector, 'index': i} for i, vector in enumerate(vectors)]
+        else:
+            position = {text: u for u, text in enumerate(unique_inputs)}
+            data = [
+                {'object': 'embedding', 'embedding': vectors[position[text]], 'index': i}
+                for i, text in enumerate(inputs)
+            ]
+
+        # Returned as a response directly: skips FastAPI's jsonable_encoder walk over every float
+        # (which also can't handle the pre-encoded vector fragments)
+        body = {'object': 'list', 'data': data, 'model': model}
+        if usage is not None:
+            body['usage'] = usage
+        return ORJSONResponse(body)
 
     except HTTPException:
         raise
+    except UpstreamBackoffError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Embedding service is overloaded - retry shortly",
+            headers={'Retry-After': str(max(1, round(e.retry_after)))}
+        )
     except httpx.ConnectError:
-        logger.error(f"Cannot connect to API embeddings endpoint at {api_base_url}/api/embeddings")
+        logger.error(f"Cannot connect to API embeddings endpoint at {EMBEDDINGS_URL}")
         raise HTTPException(
             status_code=503,
             detail="Embedding service unavailable - cannot connect to API"
@@ -1594,16 +2554,29 @@ async def create_embeddings(request: EmbeddingRequest):
         logger.error(f"Embeddings generation error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-
 # === INSPECTOR UI ===
 # Reverse proxy to MCP Inspector on localhost:6274
 # Must be LAST routes - catch-all for any paths not matched by API routes above
 
+INSPECTOR_PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+BODYLESS_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Connection-level headers that must not be relayed from the Inspector's response
+HOP_BY_HOP_HEADERS = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'transfer-encoding', 'upgrade'
+})
+
+# Request headers not forwarded to the Inspector, as raw (already lower-cased) ASGI header names
+FORWARD_EXCLUDED_HEADERS = frozenset(h.encode('latin-1') for h in HOP_BY_HOP_HEADERS | {'host'})
+
+INSPECTOR_ORIGIN = "http://localhost:6274"
+
 async def proxy_to_inspector(path: str, request: Request):
     """Helper function to proxy requests to MCP Inspector"""
     try:
         # Build target URL
-        target_url = f"http://localhost:6274/{path}"
+        target_url = f"{INSPECTOR_ORIGIN}/{path}"
 
         # Copy query params
         if request.url.query:
@@ -1611,38 +2584,78 @@ async def proxy_to_inspector(path: str, request: Request):
 
         logger.debug(f"[INSPECTOR] Proxying {request.url.path} -> {target_url}")
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Forward the request
-            response = await client.get(
-                target_url,
-                headers={k: v for k, v in request.headers.items() if k.lower() not in ['host']},
-                follow_redirects=True
-            )
-
-            # Return response with correct headers
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.headers.get('content-type')
-            )
+        # Forward the request over the shared pooled client (keep-alive to the local Inspector)
+        # Request bodies are streamed through rather than read into memory first
+        bodyless = request.method in BODYLESS_METHODS
+        upstream_request = http_client.build_request(
+            request.method,
+            target_url,
+            headers=[(k, v) for k, v in request.headers.raw if k not in FORWARD_EXCLUDED_HEADERS],
+            content=None if bodyless else request.stream(),
+            timeout=30.0
+        )
+        # Concurrency is bounded until the response headers arrive; the body then streams freely
+        started = await inspector_limiter.acquire()
+        try:
+            # A streamed body can't be replayed, so redirects (307/308) for requests with a body
+            # are handed back to the browser instead of followed here
+            response = await http_client.send(upstream_request, stream=True, follow_redirects=bodyless)
+        except httpx.ConnectError:
+            inspector_limiter.release(started)
+            raise
+        except httpx.TimeoutException:
+            inspector_limiter.release(started, 504)
+            raise
+        except BaseException:
+            inspector_limiter.discard()
+            raise
+        inspector_limiter.release(started, response.status_code, response.headers)
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        location = response.headers.get('location')
+        if location and location.startswith(INSPECTOR_ORIGIN):
+            # Keep relayed redirects on the proxy's origin rather than the Inspector's local one
+            headers = {k: v for k, v in headers.items() if k.lower() != 'location'}
+            headers['location'] = location[len(INSPECTOR_ORIGIN):] or "/"
+
+        # Relay the body as it arrives (still encoded, so Content-Encoding/Length stay valid)
+        # instead of buffering whole bundles; the upstream response is closed once sent
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers=headers,
+            media_type=response.headers.get('content-type'),
+            background=BackgroundTask(response.aclose)
+        )
+    except UpstreamBackoffError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="MCP Inspector is overloaded - retry shortly",
+            headers={'Retry-After': str(max(1, round(e.retry_after)))}
+        )
     except httpx.ConnectError:
         raise HTTPException(status_code=503, detail="MCP Inspector not available. Please wait for startup to complete.")
     except Exception as e:
         logger.error(f"Inspector proxy error for path '{path}': {e}")
         raise HTTPException(status_code=500, detail=f"Inspector proxy error: {str(e)}")
 
-@app.get("/")
+# Not in the OpenAPI schema: these are the Inspector's own routes, and a multi-method route
+# would otherwise get one duplicate operation ID per method
+@app.api_route("/", methods=INSPECTOR_PROXY_METHODS, include_in_schema=False)
 async def inspector_ui_root(request: Request):
     """Serve MCP Inspector UI root - proxy to localhost:6274"""
+    if not ENABLE_MCP_INSPECTOR:
+        raise HTTPException(status_code=404, detail="Not Found")
     return await proxy_to_inspector("", request)
 
-@app.get("/{path:path}")
+@app.api_route("/{path:path}", methods=INSPECTOR_PROXY_METHODS, include_in_schema=False)
 async def inspector_ui_proxy_all(path: str, request: Request):
     """
     Reverse proxy all other requests to MCP Inspector
     This catches /assets/*, /inspector/*, and all non-API routes
     """
+    if not ENABLE_MCP_INSPECTOR:
+        raise HTTPException(status_code=404, detail="Not Found")
     return await proxy_to_inspector(path, request)
 
 if __name__ == "__main__":
@@ -1651,9 +2664,23 @@ if __name__ == "__main__":
     logger.info(f"Tenant ID: {TENANT_ID}")
     logger.info(f"Port: {PORT}")
 
+    # Each worker is a separate process with its own MCP server subprocesses, Inspector
+    # and in-memory user sessions, so only raise UVICORN_WORKERS above 1 when that is acceptable
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
     uvicorn.run(
-        app,
+        # Worker processes need an import string; a single worker serves the app already loaded
+        # here rather than re-importing this module as "main" (which would repeat its side effects)
+        "main:app" if workers > 1 else app,
         host="0.0.0.0",
         port=PORT,
-        log_level="info"
+        log_level="info",
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        backlog=2048,
+        timeout_keep_alive=30,
+        # Bound how long shutdown waits on open connections before the lifespan drain runs
+        timeout_graceful_shutdown=int(os.getenv("UVICORN_GRACEFUL_SHUTDOWN_TIMEOUT", "20")),
+        # Beyond this many open connections/tasks per worker, new requests get 503s instead of queueing
+        limit_concurrency=int(os.getenv("UVICORN_LIMIT_CONCURRENCY", "0")) or None
     )
\ No newline at end of file
@@ -4,15 +4,17 @@ MCP Manager - Handles all MCP server instances and routing
 """
 
 import asyncio
-import json
+import collections
+import itertools
 import logging
+import orjson
 import os
-import subprocess
 import signal
+import types
 import httpx
 import uuid
-import redis
-from typing import Dict, Any, Optional, List
+from redis import asyncio as aioredis
+from typing import Dict, Any, Optional, List, Mapping, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
@@ -21,27 +23,330 @@ logger = logging.getLogger("mcp-manager")
 # Redis key prefix for MCP server enabled states
 REDIS_MCP_ENABLED_PREFIX = "mcp:server:enabled:"
 
+# Per-server request concurrency - requests beyond MCP_MAX_IN_FLIGHT wait for a slot, and once
+# MCP_MAX_QUEUED are already waiting new ones fail fast instead of piling up behind a slow server
+MCP_MAX_IN_FLIGHT = int(os.getenv("MCP_MAX_IN_FLIGHT", "32"))
+MCP_MAX_QUEUED = int(os.getenv("MCP_MAX_QUEUED", "256"))
+
+# Longest JSON-RPC line (one message) read from a server's stdout - large tool results arrive on one line
+MCP_STDIO_LINE_LIMIT = 16 * 1024 * 1024
+
+# Recent stderr kept per server for failure diagnosis (the pipe is drained continuously)
+MCP_STDERR_TAIL_LINES = 200
+MCP_STDERR_MAX_LINE = 2000  # chars kept per line
+
+# Servers started at once by start_all (each launch forks a runtime - npx/uvx/python)
+MCP_START_CONCURRENCY = int(os.getenv("MCP_START_CONCURRENCY", "8"))
+
+# Max time to wait for a newly started server to answer initialize (uvx/npx may fetch packages first)
+MCP_INIT_TIMEOUT = float(os.getenv("MCP_INIT_TIMEOUT", "60"))  # seconds
+
+# Max time to wait for a server's response to one request (0 waits indefinitely)
+MCP_REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "600"))  # seconds
+
+class MCPServerBusyError(RuntimeError):
+    """Raised when a server already has MCP_MAX_QUEUED requests waiting for a slot"""
+
 class MCPServerStatus(Enum):
     STOPPED = "stopped"
     STARTING = "starting"
     RUNNING = "running"
     FAILED = "failed"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MCPServerConfig:
+    """Immutable launch configuration - runtime state (enabled, status) lives on MCPServer"""
     name: str
-    command: List[str]
-    env: Dict[str, str]
+    command: Tuple[str, ...]
+    env: Mapping[str, str]
     transport: str = "stdio"
-    enabled: bool = True
+    enabled: bool = True  # Initial enabled state; toggled at runtime via MCPServer.enabled
     supports_obo: bool = False  # Whether this server supports per-request OBO tokens
 
+    def __post_init__(self):
+        # Accept lists/dicts from callers (add_server) but store read-only copies
+        object.__setattr__(self, "command", tuple(self.command))
+        object.__setattr__(self, "env", types.MappingProxyType(dict(self.env)))
+
+# Built-in MCP server registry, one entry per server in startup order.
+#   disabled_env: env var (or tuple of env vars, first one set wins) that disables the server when "true"
+#   env_keys: (server env var, proxy env var or None for a fixed value, default) - a default may
+#             reference earlier server env vars as {NAME}
+#   description: logged once the server is configured
+ServerSpec = collections.namedtuple(
+    "ServerSpec",
+    "key disabled_env default_disabled command env_keys supports_obo description",
+    defaults=(False, None)
+)
+
+_LOG_LEVEL = ("LOG_LEVEL", None, "info")
+_AZURE_SP_ENV = (
+    ("AZURE_TENANT_ID", "AZURE_TENANT_ID", ""),
+    ("AZURE_CLIENT_ID", "AZURE_CLIENT_ID", ""),
+    ("AZURE_CLIENT_SECRET", "AZURE_CLIENT_SECRET", ""),
+    ("AZURE_SUBSCRIPTION_ID", "AZURE_SUBSCRIPTION_ID", ""),
+)
+_AGENTICODE_ENV = (
+    ("AGENTICODE_MANAGER_URL", "AGENTICODE_MANAGER_URL", "http://agenticode-manager:3050"),
+    ("AGENTICWORK_API_URL", "AGENTICWORK_API_URL", "http://agenticwork-api:8000"),
+    ("MCP_SERVICE_AUTH_KEY", "MCP_SERVICE_AUTH_KEY", ""),  # Service-to-service auth for RBAC checks
+    ("INTERNAL_API_KEY", "CODE_MANAGER_INTERNAL_KEY", ""),  # Auth key for agenticode-manager
+    _LOG_LEVEL,
+)
+
+# Removed/disabled servers (not registered):
+# - Official Azure MCP (azmcp) - using only awp-azure-mcp (custom FastMCP with OBO)
+# - AWC Formatting MCP - formatting is handled via system prompts / native markdown
+# - Fetch MCP (uvx mcp-server-fetch) - unreliable, replaced by awp_web
+# - AWP Memory MCP - pipeline memory.stage.ts already injects relevant Milvus memories
+# - n8n MCP - functionality deprecated
+# - AWP Diagram MCP - the LLM renders diagrams inline (React Flow, Venn, DataChart) in the chat UI
+# - AWP Draw.io MCP - merged into awp_diagram
+_SERVER_SPECS = (
+    # AWP Admin MCP Server - Platform-level admin and infrastructure control
+    # IMPORTANT: This server is ONLY for admin users - access is enforced by proxy
+    ServerSpec(
+        "awp_admin", "AWP_ADMIN_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-admin-mcp/server.py"),
+        (
+            ("DATABASE_URL", "DATABASE_URL", ""),
+            ("REDIS_URL", "REDIS_URL", ""),
+            ("REDIS_HOST", "REDIS_HOST", "agenticworkchat-redis"),
+            ("REDIS_PORT", "REDIS_PORT", "6379"),
+            ("MILVUS_HOST", "MILVUS_HOST", "agenticworkchat-milvus"),
+            ("MILVUS_PORT", "MILVUS_PORT", "19530"),
+            _LOG_LEVEL,
+        ),
+        description="AWP Admin MCP server configured (Python/FastMCP - Platform Admin - ADMIN USERS ONLY)"
+    ),
+    # AWP Kubernetes MCP Server - Kubernetes cluster administration (ADMIN USERS ONLY)
+    # CRITICAL: The AgenticWork deployment namespace is READ-ONLY for safety;
+    # Kubernetes config is auto-detected (in-cluster or kubeconfig)
+    ServerSpec(
+        "awp_kubernetes", "AWP_KUBERNETES_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-kubernetes-mcp/server.py"),
+        (
+            ("AGENTICWORK_NAMESPACE", "AGENTICWORK_NAMESPACE", "agenticwork"),  # Protected namespace
+            _LOG_LEVEL,
+        ),
+        description="AWP Kubernetes MCP server configured (Python/FastMCP - K8s Admin - ADMIN USERS ONLY)"
+    ),
+    # Sequential Thinking MCP Server
+    ServerSpec(
+        "sequential_thinking", "SEQUENTIAL_THINKING_MCP_DISABLED", False,
+        ("npx", "-y", "@modelcontextprotocol/server-sequential-thinking"),
+        ()
+    ),
+    # AWP Web MCP Server - Intelligent web browsing and research
+    # Features: DuckDuckGo search, page fetching, fact verification, knowledge storage
+    ServerSpec(
+        "awp_web", "AWP_WEB_MCP_DISABLED", False,
+        ("python", "/app/mcp-servers/awp-web-mcp/server.py"),
+        (
+            _LOG_LEVEL,
+            ("REQUEST_TIMEOUT", "AWP_WEB_REQUEST_TIMEOUT", "30"),
+            ("MEMORY_MCP_URL", "MEMORY_MCP_URL", "http://mcp-proxy:3100"),
+        ),
+        description="AWP Web MCP server configured (Intelligent web browsing and research)"
+    ),
+    # Azure Cost MCP Server - Azure billing and cost analysis (DEPRECATED: use awc-azure-sdk)
+    ServerSpec(
+        "azure_cost", "AZURE_COST_MCP_DISABLED", False,
+        ("node", "/app/mcp-servers/azure-cost-mcp/dist/index.js"),
+        _AZURE_SP_ENV + (_LOG_LEVEL,)
+    ),
+    # AWP Azure MCP Server - Platform-level FastMCP with On-Behalf-Of (OBO) authentication,
+    # universal ARM API execution and a focused set of Azure tools.
+    # OBO Flow: the user token is scoped for the Main App (AZURE_CLIENT_ID), so the OBO
+    # credentials MUST be the Main App credentials; the AZURE_* SP is the no-user-token fallback
+    ServerSpec(
+        "awp_azure", "AWP_AZURE_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-azure-mcp/src/server.py"),
+        _AZURE_SP_ENV + (
+            ("AWC_AZURE_OBO_CLIENT_ID", "AZURE_CLIENT_ID", ""),
+            ("AWC_AZURE_OBO_CLIENT_SECRET", "AZURE_CLIENT_SECRET", ""),
+            _LOG_LEVEL,
+        ),
+        supports_obo=True,
+        description="AWP Azure MCP server configured (Platform-level FastMCP + OBO)"
+    ),
+    # AWP Azure Cost MCP Server - Azure Cost Management with OBO
+    # Separate from ARM operations for better organization and focused cost analysis
+    ServerSpec(
+        "awp_azure_cost", "AWP_AZURE_COST_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-azure-cost-mcp/src/server.py"),
+        _AZURE_SP_ENV + (_LOG_LEVEL,),
+        supports_obo=True,
+        description="AWP Azure Cost MCP server configured (Cost Management + OBO)"
+    ),
+    # AWP GCP MCP Server - Google Cloud Platform management via Service Account (no OBO - GCP SSO not used)
+    ServerSpec(
+        "awp_gcp", "AWP_GCP_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-gcp-mcp/src/server.py"),
+        (
+            ("GCP_PROJECT_ID", "GCP_PROJECT_ID", ""),
+            ("GCP_CREDENTIALS_JSON", "GCP_CREDENTIALS_JSON", ""),
+            ("GCP_CREDENTIALS_FILE", "GCP_CREDENTIALS_FILE", ""),
+            ("GCP_REGION", "GCP_REGION", "us-central1"),
+            _LOG_LEVEL,
+        ),
+        description="AWP GCP MCP server configured (Platform-level GCP management)"
+    ),
+    # AWP AWS MCP Server - AWS Operations with Azure AD OBO via OIDC Federation
+    # Uses Azure AD ID token → AWS STS AssumeRoleWithWebIdentity → temporary credentials
+    ServerSpec(
+        "awp_aws", "AWP_AWS_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-aws-mcp/server.py"),
+        (
+            ("AWS_REGION", "AWS_REGION", ""),
+            ("AWS_OBO_ROLE_ARN", "AWS_OBO_ROLE_ARN", ""),  # IAM role to assume via web identity
+            ("AWS_ACCOUNT_ID", "AWS_ACCOUNT_ID", ""),  # Fallback for constructing role ARN
+            # AWS Identity Center configuration (legacy - kept for backwards compat)
+            ("AWS_IC_INSTANCE_ARN", "AWS_IC_INSTANCE_ARN", ""),
+            ("AWS_IC_APPLICATION_ARN", "AWS_IC_APPLICATION_ARN", ""),
+            # Fallback credentials when NO user token
+            ("AWS_ACCESS_KEY_ID", "AWS_ACCESS_KEY_ID", ""),
+            ("AWS_SECRET_ACCESS_KEY", "AWS_SECRET_ACCESS_KEY", ""),
+            # Redis for credential caching
+            ("REDIS_HOST", "REDIS_HOST", "redis"),
+            ("REDIS_PORT", "REDIS_PORT", "6379"),
+            ("REDIS_PASSWORD", "REDIS_PASSWORD", ""),
+            _LOG_LEVEL,
+        ),
+        supports_obo=True,
+        description="AWP AWS MCP server configured (AWS via Azure AD OBO + Identity Center)"
+    ),
+    # VMware MCP Server (opt-in) - VMware infrastructure management
+    ServerSpec(
+        "vmware", "VMWARE_MCP_DISABLED", True,
+        ("node", "/app/mcp-servers/vmware-mcp-server/dist/index.js"),
+        (
+            ("VMWARE_HOST", "VMWARE_HOST", ""),
+            ("VMWARE_USERNAME", "VMWARE_USERNAME", ""),
+            ("VMWARE_PASSWORD", "VMWARE_PASSWORD", ""),
+            _LOG_LEVEL,
+        )
+    ),
+    # AWP Prometheus MCP Server - Platform-level metrics querying and visualization
+    # Checks both env var names for backwards compatibility
+    ServerSpec(
+        "awp_prometheus", ("PROMETHEUS_MCP_DISABLED", "AWP_PROMETHEUS_MCP_DISABLED"), False,
+        ("prometheus-mcp-server",),
+        (
+            ("PROMETHEUS_URL", "PROMETHEUS_URL", "http://prometheus:9090"),
+            _LOG_LEVEL,
+        ),
+        description="AWP Prometheus MCP server configured (Platform-level monitoring)"
+    ),
+    # AWP Flowise MCP Server - Platform-level unified workflow management for Flowise,
+    # with OBO for per-user workspace isolation
+    # IMPORTANT: FLOWISE_URL must go through the API proxy (/api/flowise-workspace) for workspace injection
+    ServerSpec(
+        "awp_flowise", "AWP_FLOWISE_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-flowise-mcp/server.py"),
+        (
+            # API URL for the workspace proxy and for validating tokens / looking up workspace info
+            ("API_INTERNAL_URL", "API_INTERNAL_URL", "http://agenticwork-api:8000"),
+            ("FLOWISE_URL", "FLOWISE_URL", "{API_INTERNAL_URL}/api/flowise-workspace"),
+            # Direct URL for admin operations that don't need workspace context
+            ("FLOWISE_DIRECT_URL", "FLOWISE_DIRECT_URL", "http://agenticwork-flowise:3000"),
+            ("FLOWISE_API_KEY", "FLOWISE_API_KEY", ""),
+            ("FLOWISE_ADMIN_TOKEN", "FLOWISE_ADMIN_TOKEN", ""),  # Super-admin token for cross-workspace ops
+            ("FLOWISE_DEFAULT_WORKSPACE_ID", "FLOWISE_DEFAULT_WORKSPACE_ID", ""),  # BUG-001 fix: fallback workspace
+            ("APP_BASE_URL", "APP_BASE_URL", "https://chat-dev.agenticwork.io"),
+            _LOG_LEVEL,
+        ),
+        supports_obo=True,
+        description="AWP Flowise MCP server configured (Platform-level workflow management + OBO)"
+    ),
+    # AWP AgentiCode MCP Server - Code execution through AgentiCode Manager
+    # (execute_code, run_shell_command, write_file/read_file in the user's workspace)
+    # Per-user isolation via session management / user_id parameter, not OBO
+    ServerSpec(
+        "awp_agenticode", "AWP_AGENTICODE_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-agenticode-mcp/server.py"),
+        _AGENTICODE_ENV,
+        description="AWP AgentiCode MCP server configured (SAFE MODE - read/write only, no execution)"
+    ),
+    # AWP AgenticWork CLI MCP Server - Controlled Agentic Workflows via Serverless CLI
+    # Tools: run_agenticode_task, run_code_generation, run_file_operation, check_agenticode_status
+    # Uses code-manager's /serverless endpoints for isolated one-shot execution
+    ServerSpec(
+        "awp_agenticwork_cli", "AWP_AGENTICWORK_CLI_MCP_DISABLED", False,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-agenticwork-cli-mcp/server.py"),
+        _AGENTICODE_ENV,
+        description="AWP AgenticWork CLI MCP server configured (Controlled agentic workflows via serverless CLI)"
+    ),
+    # AWP ServiceNow MCP Server (opt-in) - Incident, Change, and Service Request management
+    # Uses Azure AD OBO for per-user access to their ServiceNow tickets
+    ServerSpec(
+        "awp_servicenow", "AWP_SERVICENOW_MCP_DISABLED", True,
+        ("fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-servicenow-mcp/src/server.py"),
+        (
+            ("SERVICENOW_INSTANCE_URL", "SERVICENOW_INSTANCE_URL", ""),
+            ("SERVICENOW_CLIENT_ID", "SERVICENOW_CLIENT_ID", ""),
+            ("SERVICENOW_CLIENT_SECRET", "SERVICENOW_CLIENT_SECRET", ""),
+            # Azure AD for OBO token exchange
+            ("AZURE_TENANT_ID", "AZURE_TENANT_ID", ""),
+            ("AZURE_CLIENT_ID", "AZURE_CLIENT_ID", ""),
+            ("AZURE_CLIENT_SECRET", "AZURE_CLIENT_SECRET", ""),
+            # Fallback service account (when no user token)
+            ("SERVICENOW_USERNAME", "SERVICENOW_USERNAME", ""),
+            ("SERVICENOW_PASSWORD", "SERVICENOW_PASSWORD", ""),
+            _LOG_LEVEL,
+        ),
+        supports_obo=True,
+        description="AWP ServiceNow MCP server configured (Incident/Change/Request management + OBO)"
+    ),
+    # AWS Knowledge MCP Server - Remote AWS-hosted service for docs, APIs, best practices
+    # Provides guidance on how to use AWS APIs - complements our awp_aws MCP
+    ServerSpec(
+        "aws_knowledge", "AWS_KNOWLEDGE_MCP_DISABLED", False,
+        ("uvx", "fastmcp", "run", "https://knowledge-mcp.global.api.aws"),
+        (("AWS_REGION", "AWS_REGION", ""),),
+        description="AWS Knowledge MCP server configured (AWS docs and best practices)"
+    ),
+)
+
+def _spec_disabled(spec: ServerSpec) -> bool:
+    """Whether a built-in server is disabled via its env var(s)"""
+    names = (spec.disabled_env,) if isinstance(spec.disabled_env, str) else spec.disabled_env
+    for name in names:
+        value = os.getenv(name)
+        if value is not None:
+            return value.lower() == "true"
+    return spec.default_disabled
+
 class MCPServer:
+    __slots__ = (
+        "config", "enabled", "process", "status", "last_error", "process_env",
+        "request_slots", "in_flight", "queued",
+        "pending", "write_lock", "reader_task", "_request_ids",
+        "stderr_tail", "stderr_task",
+    )
+
     def __init__(self, config: MCPServerConfig):
         self.config = config
-        self.process: Optional[subprocess.Popen] = None
+        self.enabled = config.enabled  # Runtime state - overridden from Redis / set_server_enabled
+        self.process: Optional[asyncio.subprocess.Process] = None
         self.status = MCPServerStatus.STOPPED
         self.last_error: Optional[str] = None
+        self.process_env: Optional[Dict[str, str]] = None  # Proxy env + config.env, built on first start
+
+        # Bounds concurrent requests so one slow server can't absorb every waiting request
+        self.request_slots = asyncio.Semaphore(MCP_MAX_IN_FLIGHT)
+        self.in_flight = 0
+        self.queued = 0
+
+        # Requests are pipelined over stdio: each gets a unique wire id and a future that the
+        # server's single stdout reader resolves when the matching response arrives
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.write_lock = asyncio.Lock()
+        self.reader_task: Optional[asyncio.Task] = None
+        self._request_ids = itertools.count(1)
+
+        self.stderr_tail: collections.deque = collections.deque(maxlen=MCP_STDERR_TAIL_LINES)
+        self.stderr_task: Optional[asyncio.Task] = None
 
     async def start(self):
         """Start the MCP server process"""
@@ -52,52 +357,60 @@ class MCPServer:
             self.status = MCPServerStatus.STARTING
             logger.info(f"Starting MCP server: {self.config.name}")
 
-            # Merge environment variables
-            env = os.environ.copy()
-            env.update(self.config.env)
-
-            self.process = subprocess.Popen(
-                self.config.command,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+            # Merge environment variables (once - restarts reuse the merged env)
+            if self.process_env is None:
+                self.process_env = {**os.environ, **self.config.env}
+            env = self.process_env
+
+            # Non-blocking pipes - requests to one server never stall the event loop for the others
+            self.process = await asyncio.create_subprocess_exec(
+                *self.config.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
                 env=env,
-                text=True,
-                bufsize=0  # Unbuffered for real-time communication
+                limit=MCP_STDIO_LINE_LIMIT
             )
+            self.reader_task = asyncio.create_task(self._read_responses(self.process))
+            self.stderr_tail.clear()
+            self.stderr_task = asyncio.create_task(self._drain_stderr(self.process))
 
-            # Give it a moment to start
-            await asyncio.sleep(1)
-
-            if self.process.poll() is None:
-                self.status = MCPServerStatus.RUNNING
-                logger.info(f"MCP server {self.config.name} started successfully (PID: {self.process.pid})")
-
-                # Initialize the MCP server (required by MCP protocol)
-                try:
-                    init_request = {
-                        "jsonrpc": "2.0",
-                        "id": 0,
-                        "method": "initialize",
-                        "params": {
-                            "protocolVersion": "2024-11-05",
-                            "capabilities": {},
-                            "clientInfo": {
-                                "name": "mcp-proxy",
-                                "version": "1.0.0"
-                            }
+            # Ready as soon as it answers initialize (required by MCP protocol) - no fixed warm-up
+            # sleep. A process that exits first closes stdout, which fails the request right away.
+            try:
+                init_request = {
+                    "jsonrpc": "2.0",
+                    "id": 0,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": "2024-11-05",
+                        "capabilities": {},
+                        "clientInfo": {
+                            "name": "mcp-proxy",
+                            "version": "1.0.0"
                         }
                     }
-                    init_response = await self.send_request(init_request)
-                    if "error" in init_response:
-                        logger.warning(f"MCP server {self.config.name} initialization returned error: {init_response['error']}")
-                    else:
-                        logger.info(f"MCP server {self.config.name} initialized successfully")
-                except Exception as e:
+                }
+                init_response = await self.send_request(init_request, timeout=MCP_INIT_TIMEOUT)
+                if "error" in init_response:
+                    logger.warning(f"MCP server {self.config.name} initialization returned error: {init_response['error']}")
+                else:
+                    logger.info(f"MCP server {self.config.name} initialized successfully")
+            except Exception as e:
+                if self.process.stdout.at_eof():
+                    # Output closed - give the exit status a moment to be collected
+                    try:
+                        await asyncio.wait_for(self.process.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                if self.process.returncode is None:
                     logger.warning(f"Failed to initialize MCP server {self.config.name}: {e}")
+
+            if self.process.returncode is None:
+                self.status = MCPServerStatus.RUNNING
+                logger.info(f"MCP server {self.config.name} started successfully (PID: {self.process.pid})")
             else:
-                stderr = self.process.stderr.read() if self.process.stderr else "No error output"
-                self.last_error = f"Process exited immediately: {stderr}"
+                self.last_error = f"Process exited immediately: {await self.recent_stderr()}"
                 self.status = MCPServerStatus.FAILED
                 logger.error(f"MCP server {self.config.name} failed to start: {self.last_error}")
 
@@ -106,480 +419,180 @@ class MCPServer:
             self.status = MCPServerStatus.FAILED
             logger.error(f"Failed to start MCP server {self.config.name}: {e}")
 
+    async def _read_responses(self, process: asyncio.subprocess.Process):
+        """Own the server's stdout: hand each JSON-RPC response to the request waiting on its id"""
+        try:
+            while True:
+                try:
+                    line = await process.stdout.readline()
+                except ValueError as e:
+                    # Line longer than MCP_STDIO_LINE_LIMIT - it was discarded, keep reading
+                    logger.error(f"[{self.config.name}] Dropped oversized message from server: {e}")
+                    continue
+                if not line:
+                    break  # EOF - the process exited or closed stdout
+
+                try:
+                    message = orjson.loads(line)
+                except ValueError:
+                    logger.debug(f"[{self.config.name}] Ignoring non-JSON stdout line: {line[:200]!r}")
+                    continue
+                if not isinstance(message, dict) or "method" in message:
+                    continue  # Notifications / server-initiated requests aren't responses
+
+                waiter = self.pending.pop(str(message.get("id")), None)
+                if waiter is None:
+                    logger.warning(f"[{self.config.name}] Dropping response for unknown request id={message.get('id')}")
+                elif not waiter.done():
+                    waiter.set_result((message, line))  # Raw line kept for logging
+        finally:
+            closed = RuntimeError(f"MCP server {self.config.name} closed its output")
+            for waiter in self.pending.values():
+                if not waiter.done():
+                    waiter.set_exception(closed)
+            self.pending.clear()
+
+    async def _drain_stderr(self, process: asyncio.subprocess.Process):
+        """Keep reading stderr so the child never blocks on a full pipe; remember the last lines"""
+        while True:
+            try:
+                line = await process.stderr.readline()
+            except ValueError:
+                continue  # Oversized line - discarded
+            if not line:
+                break
+            self.stderr_tail.append(line[:MCP_STDERR_MAX_LINE].decode('utf-8', 'replace'))
+
+    async def recent_stderr(self) -> str:
+        """Last stderr output, after giving an exiting process a moment to flush it"""
+        if self.stderr_task and not self.stderr_task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self.stderr_task), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+        return "".join(self.stderr_tail) or "No error output"
+
     async def stop(self):
         """Stop the MCP server process"""
-        if self.process and self.process.poll() is None:
+        if self.process and self.process.returncode is None:
             logger.info(f"Stopping MCP server: {self.config.name}")
             self.process.terminate()
             try:
-                await asyncio.wait_for(asyncio.to_thread(self.process.wait), timeout=5.0)
+                await asyncio.wait_for(self.process.wait(), timeout=5.0)
             except asyncio.TimeoutError:
                 logger.warning(f"Force killing MCP server: {self.config.name}")
                 self.process.kill()
+                await self.process.wait()
             self.status = MCPServerStatus.STOPPED
-
-    async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.reader_task:
+            # Wait for it to fail its pending requests before a restart registers new ones
+            self.reader_task.cancel()
+            try:
+                await self.reader_task
+            except asyncio.CancelledError:
+                pass
+            self.reader_task = None
+        if self.stderr_task:
+            self.stderr_task.cancel()
+            self.stderr_task = None
+
+    async def send_request(self, request: Dict[str, Any], timeout: float = MCP_REQUEST_TIMEOUT) -> Dict[str, Any]:
         """Send MCP request to server"""
-        if self.status != MCPServerStatus.RUNNING or not self.process:
+        if self.status not in (MCPServerStatus.RUNNING, MCPServerStatus.STARTING) or not self.process:
             raise RuntimeError(f"MCP server {self.config.name} is not running")
 
+        # The caller's id is restored on the response; on the wire each request gets its own
+        # so concurrent callers reusing an id (e.g. "1") can't receive each other's responses
+        request_id = request.get("id")
+        wire_id = next(self._request_ids)
+        waiter = asyncio.get_running_loop().create_future()
+        self.pending[str(wire_id)] = waiter
+
         try:
-            # Log the request
-            request_id = request.get("id")
-            logger.info(f"[{self.config.name}] REQUEST: {json.dumps(request)}")
-
-            # Send request as JSON-RPC over stdin
-            request_str = json.dumps(request) + "\n"
-            self.process.stdin.write(request_str)
-            self.process.stdin.flush()
-
-            # Read response from stdout - keep reading until we get matching ID
-            # This handles cases where stale responses might be in the buffer
-            max_attempts = 10
-            for attempt in range(max_attempts):
-                response_str = self.process.stdout.readline()
-                if not response_str.strip():
-                    raise RuntimeError("Empty response from MCP server")
-
-                response = json.loads(response_str.strip())
-
-                # Check if response ID matches request ID
-                response_id = response.get("id")
-
-                # Normalize ID types for comparison (string "1" vs int 1)
-                request_id_normalized = str(request_id) if request_id is not None else None
-                response_id_normalized = str(response_id) if response_id is not None else None
-
-                if request_id_normalized == response_id_normalized:
-                    # Log the response
-                    logger.info(f"[{self.config.name}] RESPONSE: {json.dumps(response)}")
-                    return response
-                else:
-                    # Stale response from a different request - skip it
-                    logger.warning(f"[{self.config.name}] Skipping stale response (expected id={request_id}, got id={response_id})")
-                    continue
+            # Send request as JSON-RPC over stdin (serialized once - the log reuses the bytes)
+            request_line = orjson.dumps({**request, "id": wire_id}) + b"\n"
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("[%s] REQUEST: %s", self.config.name, request_line[:-1].decode('utf-8'))
+            async with self.write_lock:
+                self.process.stdin.write(request_line)
+                await self.process.stdin.drain()
+
+            try:
+                response, response_line = await asyncio.wait_for(waiter, timeout or None)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"No response from MCP server {self.config.name} within {timeout:g}s")
+            response["id"] = request_id
 
-            raise RuntimeError(f"Failed to get matching response after {max_attempts} attempts")
+            # Full response payloads (ARM dumps, Prometheus series, ...) are only decoded for debug logging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[%s] RESPONSE: %s", self.config.name, response_line.rstrip().decode('utf-8', 'replace'))
+            return response
 
         except Exception as e:
             logger.error(f"Error communicating with MCP server {self.config.name}: {e}")
             # Check if process is still alive
-            if self.process.poll() is not None:
+            if self.process.returncode is not None:
                 self.status = MCPServerStatus.FAILED
-                stderr = self.process.stderr.read() if self.process.stderr else "No error output"
-                self.last_error = f"Process died: {stderr}"
+                self.last_error = f"Process died: {await self.recent_stderr()}"
             raise
+        finally:
+            self.pending.pop(str(wire_id), None)
 
 class MCPManager:
-    def __init__(self, redis_client: Optional[redis.Redis] = None):
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None):
         self.servers: Dict[str, MCPServer] = {}
         self.redis_client = redis_client
         self.initialize_servers()
 
-        # Load runtime enabled states from Redis (overrides build-time config)
-        if self.redis_client:
-            self._load_enabled_states_from_redis()
-
     def initialize_servers(self):
-        """Initialize all MCP server configurations"""
-
-        # ==========================================
-        # Official Azure MCP (azmcp) - REMOVED
-        # Using only awp-azure-mcp (custom FastMCP with OBO)
-        # ==========================================
-        logger.info("Official Azure MCP (azmcp) disabled - using awp-azure-mcp only")
-
-        # AWP Admin MCP Server - Platform-level admin and infrastructure control (Node.js)
-        # IMPORTANT: This server is ONLY for admin users - access is enforced by proxy
-        if not os.getenv("AWP_ADMIN_MCP_DISABLED", "false").lower() == "true":
-            awp_admin_env = {
-                "DATABASE_URL": os.getenv("DATABASE_URL", ""),
-                "REDIS_URL": os.getenv("REDIS_URL", ""),
-                "REDIS_HOST": os.getenv("REDIS_HOST", "agenticworkchat-redis"),
-                "REDIS_PORT": os.getenv("REDIS_PORT", "6379"),
-                # Milvus configuration
-                "MILVUS_HOST": os.getenv("MILVUS_HOST", "agenticworkchat-milvus"),
-                "MILVUS_PORT": os.getenv("MILVUS_PORT", "19530"),
-                "LOG_LEVEL": "info"
-            }
-
-            # Using Python FastMCP awp-admin-mcp implementation
-            self.servers["awp_admin"] = MCPServer(MCPServerConfig(
-                name="awp_admin",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-admin-mcp/server.py"],
-                env=awp_admin_env
-            ))
-            logger.info("AWP Admin MCP server configured (Python/FastMCP - Platform Admin - ADMIN USERS ONLY)")
-
-        # AWP Kubernetes MCP Server - Kubernetes cluster administration
-        # IMPORTANT: This server is ONLY for admin users - access is enforced by proxy
-        # CRITICAL: The AgenticWork deployment namespace is READ-ONLY for safety
-        if not os.getenv("AWP_KUBERNETES_MCP_DISABLED", "false").lower() == "true":
-            awp_kubernetes_env = {
-                # Protected namespace - the namespace where AgenticWork runs (read-only)
-                "AGENTICWORK_NAMESPACE": os.getenv("AGENTICWORK_NAMESPACE", "agenticwork"),
-                # Kubernetes config is auto-detected (in-cluster or kubeconfig)
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_kubernetes"] = MCPServer(MCPServerConfig(
-                name="awp_kubernetes",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-kubernetes-mcp/server.py"],
-                env=awp_kubernetes_env
-            ))
-            logger.info("AWP Kubernetes MCP server configured (Python/FastMCP - K8s Admin - ADMIN USERS ONLY)")
-
-        # AWC Formatting MCP Server - DISABLED
-        # Redundant - formatting should be handled via system prompts, not a separate MCP
-        # The LLM should use its native markdown capabilities rather than needing an MCP for formatting
-        # if not os.getenv("AWC_FORMATTING_MCP_DISABLED", "false").lower() == "true":
-        #     awc_formatting_env = {
-        #         "LOG_LEVEL": "info"
-        #     }
-        #
-        #     self.servers["awc_formatting"] = MCPServer(MCPServerConfig(
-        #         name="awc_formatting",
-        #         command=["node", "/app/mcp-servers/awc-formatting-mcp/dist/index.js"],
-        #         env=awc_formatting_env
-        #     ))
-        #     logger.info("AWC Formatting MCP server configured (Chat UI formatting)")
-
-        # Sequential Thinking MCP Server
-        if not os.getenv("SEQUENTIAL_THINKING_MCP_DISABLED", "false").lower() == "true":
-            self.servers["sequential_thinking"] = MCPServer(MCPServerConfig(
-                name="sequential_thinking",
-                command=["npx", "-y", "@modelcontextprotocol/server-sequential-thinking"],
-                env={}
+        """Initialize all MCP server configurations from _SERVER_SPECS"""
+        for spec in _SERVER_SPECS:
+            if _spec_disabled(spec):
+                continue
+
+            env: Dict[str, str] = {}
+            for target, env_name, default in spec.env_keys:
+                if "{" in default:
+                    default = default.format_map(env)
+                env[target] = os.getenv(env_name, default) if env_name else default
+
+            self.servers[spec.key] = MCPServer(MCPServerConfig(
+                name=spec.key,
+                command=spec.command,
+                env=env,
+                supports_obo=spec.supports_obo
             ))
+            if spec.description:
+                logger.info(spec.description)
 
-        # Fetch MCP Server - REPLACED by awp-web-mcp
-        # The standard fetch MCP was unreliable. Use awp_web instead for web browsing.
-        # if not os.getenv("FETCH_MCP_DISABLED", "false").lower() == "true":
-        #     self.servers["fetch"] = MCPServer(MCPServerConfig(
-        #         name="fetch",
-        #         command=["uvx", "mcp-server-fetch", "--ignore-robots-txt"],
-        #         env={}
-        #     ))
+        logger.info("Official Azure MCP (azmcp) disabled - using awp-azure-mcp only")
         logger.info("Standard fetch MCP disabled - using awp_web MCP instead")
-
-        # AWP Web MCP Server - Intelligent web browsing and research
-        # Features: DuckDuckGo search, page fetching, fact verification, knowledge storage
-        if not os.getenv("AWP_WEB_MCP_DISABLED", "false").lower() == "true":
-            awp_web_env = {
-                "LOG_LEVEL": "info",
-                "REQUEST_TIMEOUT": os.getenv("AWP_WEB_REQUEST_TIMEOUT", "30"),
-                "MEMORY_MCP_URL": os.getenv("MEMORY_MCP_URL", "http://mcp-proxy:3100"),
-            }
-
-            self.servers["awp_web"] = MCPServer(MCPServerConfig(
-                name="awp_web",
-                command=["python", "/app/mcp-servers/awp-web-mcp/server.py"],
-                env=awp_web_env
-            ))
-            logger.info("AWP Web MCP server configured (Intelligent web browsing and research)")
-
-        # AWP Memory MCP Server - REMOVED
-        # Redundant: pipeline memory.stage.ts already does automatic Milvus semantic search
-        # The LLM calling memory tools manually wastes tokens when the pipeline already injects
-        # relevant memories into the context automatically.
-
-        # Azure Cost MCP Server - Azure billing and cost analysis (DEPRECATED: use awc-azure-sdk)
-        azure_cost_env = {
-            "AZURE_TENANT_ID": os.getenv("AZURE_TENANT_ID", ""),
-            "AZURE_CLIENT_ID": os.getenv("AZURE_CLIENT_ID", ""),
-            "AZURE_CLIENT_SECRET": os.getenv("AZURE_CLIENT_SECRET", ""),
-            "AZURE_SUBSCRIPTION_ID": os.getenv("AZURE_SUBSCRIPTION_ID", ""),
-            "LOG_LEVEL": "info"
-        }
-
-        if not os.getenv("AZURE_COST_MCP_DISABLED", "false").lower() == "true":
-            self.servers["azure_cost"] = MCPServer(MCPServerConfig(
-                name="azure_cost",
-                command=["node", "/app/mcp-servers/azure-cost-mcp/dist/index.js"],
-                env=azure_cost_env
-            ))
-
-        # AWP Azure MCP Server - Platform-level FastMCP with OBO
-        # This is our custom Azure MCP with:
-        # - On-Behalf-Of (OBO) authentication flow
-        # - Universal ARM API execution
-        # - Focused set of Azure tools for platform-wide use
-        if not os.getenv("AWP_AZURE_MCP_DISABLED", "false").lower() == "true":
-            # OBO Flow: User token is scoped for Main App (AZURE_CLIENT_ID)
-            # Main App uses its credentials to exchange that token for Azure Management token
-            # This is standard OAuth 2.0 On-Behalf-Of flow
-            awp_azure_env = {
-                "AZURE_TENANT_ID": os.getenv("AZURE_TENANT_ID", ""),
-                # Fallback credentials when NO user token - uses shared service principal
-                "AZURE_CLIENT_ID": os.getenv("AZURE_CLIENT_ID", ""),
-                "AZURE_CLIENT_SECRET": os.getenv("AZURE_CLIENT_SECRET", ""),
-                "AZURE_SUBSCRIPTION_ID": os.getenv("AZURE_SUBSCRIPTION_ID", ""),
-                # OBO credentials - MUST be Main App credentials (not Azure MCP SP)
-                # because user token is scoped for Main App's Application ID URI
-                "AWC_AZURE_OBO_CLIENT_ID": os.getenv("AZURE_CLIENT_ID", ""),
-                "AWC_AZURE_OBO_CLIENT_SECRET": os.getenv("AZURE_CLIENT_SECRET", ""),
-                "LOG_LEVEL": "info"
-            }
-
-            # FastMCP servers must be run via `fastmcp run -t stdio` for stdio transport
-            self.servers["awp_azure"] = MCPServer(MCPServerConfig(
-                name="awp_azure",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-azure-mcp/src/server.py"],
-                env=awp_azure_env,
-                supports_obo=True  # This server supports OBO token injection
-            ))
-            logger.info("AWP Azure MCP server configured (Platform-level FastMCP + OBO)")
-
-        # AWP Azure Cost MCP Server - Azure Cost Management with OBO
-        # Separate from ARM operations for better organization and focused cost analysis
-        if not os.getenv("AWP_AZURE_COST_MCP_DISABLED", "false").lower() == "true":
-            awp_azure_cost_env = {
-                "AZURE_TENANT_ID": os.getenv("AZURE_TENANT_ID", ""),
-                "AZURE_CLIENT_ID": os.getenv("AZURE_CLIENT_ID", ""),
-                "AZURE_CLIENT_SECRET": os.getenv("AZURE_CLIENT_SECRET", ""),
-                "AZURE_SUBSCRIPTION_ID": os.getenv("AZURE_SUBSCRIPTION_ID", ""),
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_azure_cost"] = MCPServer(MCPServerConfig(
-                name="awp_azure_cost",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-azure-cost-mcp/src/server.py"],
-                env=awp_azure_cost_env,
-                supports_obo=True  # This server supports OBO token injection
-            ))
-            logger.info("AWP Azure Cost MCP server configured (Cost Management + OBO)")
-
-        # AWP GCP MCP Server - Google Cloud Platform management via Service Account
-        # Uses service account authentication (no OBO - GCP SSO not used)
-        if not os.getenv("AWP_GCP_MCP_DISABLED", "false").lower() == "true":
-            awp_gcp_env = {
-                "GCP_PROJECT_ID": os.getenv("GCP_PROJECT_ID", ""),
-                "GCP_CREDENTIALS_JSON": os.getenv("GCP_CREDENTIALS_JSON", ""),
-                "GCP_CREDENTIALS_FILE": os.getenv("GCP_CREDENTIALS_FILE", ""),
-                "GCP_REGION": os.getenv("GCP_REGION", "us-central1"),
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_gcp"] = MCPServer(MCPServerConfig(
-                name="awp_gcp",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-gcp-mcp/src/server.py"],
-                env=awp_gcp_env,
-                supports_obo=False  # GCP uses service account auth, not OBO
-            ))
-            logger.info("AWP GCP MCP server configured (Platform-level GCP management)")
-
-        # AWP AWS MCP Server - AWS Operations with Azure AD OBO via OIDC Federation
-        # Uses Azure AD ID token → AWS STS AssumeRoleWithWebIdentity → temporary credentials
-        if not os.getenv("AWP_AWS_MCP_DISABLED", "false").lower() == "true":
-            awp_aws_env = {
-                "AWS_REGION": os.getenv("AWS_REGION", ""),
-                # AWS OIDC Federation configuration for OBO (Azure AD → STS)
-                "AWS_OBO_ROLE_ARN": os.getenv("AWS_OBO_ROLE_ARN", ""),  # IAM role to assume via web identity
-                "AWS_ACCOUNT_ID": os.getenv("AWS_ACCOUNT_ID", ""),  # Fallback for constructing role ARN
-                # AWS Identity Center configuration (legacy - kept for backwards compat)
-                "AWS_IC_INSTANCE_ARN": os.getenv("AWS_IC_INSTANCE_ARN", ""),
-                "AWS_IC_APPLICATION_ARN": os.getenv("AWS_IC_APPLICATION_ARN", ""),
-                # Fallback credentials when NO user token
-                "AWS_ACCESS_KEY_ID": os.getenv("AWS_ACCESS_KEY_ID", ""),
-                "AWS_SECRET_ACCESS_KEY": os.getenv("AWS_SECRET_ACCESS_KEY", ""),
-                # Redis for credential caching
-                "REDIS_HOST": os.getenv("REDIS_HOST", "redis"),
-                "REDIS_PORT": os.getenv("REDIS_PORT", "6379"),
-                "REDIS_PASSWORD": os.getenv("REDIS_PASSWORD", ""),
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_aws"] = MCPServer(MCPServerConfig(
-                name="awp_aws",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-aws-mcp/server.py"],
-                env=awp_aws_env,
-                supports_obo=True  # This server supports OBO token injection (Azure AD → AWS IC)
-            ))
-            logger.info("AWP AWS MCP server configured (AWS via Azure AD OBO + Identity Center)")
-
-        # VMware MCP Server (if enabled) - VMware infrastructure management
-        vmware_env = {
-            "VMWARE_HOST": os.getenv("VMWARE_HOST", ""),
-            "VMWARE_USERNAME": os.getenv("VMWARE_USERNAME", ""),
-            "VMWARE_PASSWORD": os.getenv("VMWARE_PASSWORD", ""),
-            "LOG_LEVEL": "info"
-        }
-
-        if not os.getenv("VMWARE_MCP_DISABLED", "true").lower() == "true":
-            self.servers["vmware"] = MCPServer(MCPServerConfig(
-                name="vmware",
-                command=["node", "/app/mcp-servers/vmware-mcp-server/dist/index.js"],
-                env=vmware_env
-            ))
-
-        # AWP Prometheus MCP Server - Platform-level metrics querying and visualization
-        # Check both env var names for backwards compatibility
-        prometheus_disabled = os.getenv("PROMETHEUS_MCP_DISABLED", os.getenv("AWP_PROMETHEUS_MCP_DISABLED", "false")).lower() == "true"
-        if not prometheus_disabled:
-            awp_prometheus_env = {
-                "PROMETHEUS_URL": os.getenv("PROMETHEUS_URL", "http://prometheus:9090"),
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_prometheus"] = MCPServer(MCPServerConfig(
-                name="awp_prometheus",
-                command=["prometheus-mcp-server"],
-                env=awp_prometheus_env
-            ))
-            logger.info("AWP Prometheus MCP server configured (Platform-level monitoring)")
-
-        # AWP Flowise MCP Server - Platform-level unified workflow management for Flowise
-        # Now with OBO support for per-user workspace isolation
-        # IMPORTANT: FLOWISE_URL must go through the API proxy (/api/flowise-workspace) for workspace injection
-        if not os.getenv("AWP_FLOWISE_MCP_DISABLED", "false").lower() == "true":
-            # Get API URL for workspace proxy - this is where OBO workspace context is injected
-            api_internal_url = os.getenv("API_INTERNAL_URL", "http://agenticwork-api:8000")
-            flowise_proxy_url = f"{api_internal_url}/api/flowise-workspace"
-
-            awp_flowise_env = {
-                # FLOWISE_URL goes through API proxy for workspace injection (OBO)
-                "FLOWISE_URL": os.getenv("FLOWISE_URL", flowise_proxy_url),
-                # Direct URL for admin operations that don't need workspace context
-                "FLOWISE_DIRECT_URL": os.getenv("FLOWISE_DIRECT_URL", "http://agenticwork-flowise:3000"),
-                # API URL for validating tokens and looking up workspace info
-                "API_INTERNAL_URL": api_internal_url,
-                "FLOWISE_API_KEY": os.getenv("FLOWISE_API_KEY", ""),
-                "FLOWISE_ADMIN_TOKEN": os.getenv("FLOWISE_ADMIN_TOKEN", ""),  # Super-admin token for cross-workspace ops
-                "FLOWISE_DEFAULT_WORKSPACE_ID": os.getenv("FLOWISE_DEFAULT_WORKSPACE_ID", ""),  # BUG-001 fix: fallback workspace
-                "APP_BASE_URL": os.getenv("APP_BASE_URL", "https://chat-dev.agenticwork.io"),
-                "LOG_LEVEL": "info"
-            }
-
-            # Use fastmcp run for proper stdio transport (same as awp_azure)
-            self.servers["awp_flowise"] = MCPServer(MCPServerConfig(
-                name="awp_flowise",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-flowise-mcp/server.py"],
-                env=awp_flowise_env,
-                supports_obo=True  # Enable OBO token injection for per-user workspace isolation
-            ))
-            logger.info("AWP Flowise MCP server configured (Platform-level workflow management + OBO)")
-
-        # n8n MCP removed - functionality deprecated
-
-        # AWP Diagram MCP Server - DISABLED
-        # The LLM now renders diagrams inline using React Flow, Venn, and DataChart components
-        # in the chat UI. This avoids duplicate rendering (both inline AND MCP tool call).
-        # Re-enable by setting AWP_DIAGRAM_MCP_DISABLED=false
-        # if not os.getenv("AWP_DIAGRAM_MCP_DISABLED", "true").lower() == "true":
-        #     awp_diagram_env = {
-        #         "LOG_LEVEL": "info"
-        #     }
-        #
-        #     self.servers["awp_diagram"] = MCPServer(MCPServerConfig(
-        #         name="awp_diagram",
-        #         command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-diagram-mcp/server.py"],
-        #         env=awp_diagram_env,
-        #         supports_obo=False  # Diagrams don't need user context
-        #     ))
-        #     logger.info("AWP Diagram MCP server configured (React Flow + DrawIO diagram generation)")
         logger.info("AWP Diagram MCP disabled - LLM renders diagrams inline via React Flow/Venn/DataChart")
-
-        # AWP Draw.io MCP - DEPRECATED: Merged into awp_diagram MCP
-        # The awp_diagram MCP now handles both React Flow and DrawIO formats
-
-        # AWP AgentiCode MCP Server - Code execution through AgentiCode Manager
-        # Enables the LLM to ACTUALLY execute code, not just pretend:
-        # - execute_code: Write and run Python, Go, Bash, JS, etc.
-        # - run_shell_command: Execute shell commands
-        # - write_file/read_file: File operations in user's workspace
-        # Per-user isolation via session management
-        if not os.getenv("AWP_AGENTICODE_MCP_DISABLED", "false").lower() == "true":
-            awp_agenticode_env = {
-                "AGENTICODE_MANAGER_URL": os.getenv("AGENTICODE_MANAGER_URL", "http://agenticode-manager:3050"),
-                "AGENTICWORK_API_URL": os.getenv("AGENTICWORK_API_URL", "http://agenticwork-api:8000"),
-                "MCP_SERVICE_AUTH_KEY": os.getenv("MCP_SERVICE_AUTH_KEY", ""),  # Service-to-service auth for RBAC checks
-                "INTERNAL_API_KEY": os.getenv("CODE_MANAGER_INTERNAL_KEY", ""),  # Auth key for agenticode-manager
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_agenticode"] = MCPServer(MCPServerConfig(
-                name="awp_agenticode",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-agenticode-mcp/server.py"],
-                env=awp_agenticode_env,
-                supports_obo=False  # Uses user_id parameter for isolation, not OBO token
-            ))
-            logger.info("AWP AgentiCode MCP server configured (SAFE MODE - read/write only, no execution)")
-
-        # AWP AgenticWork CLI MCP Server - Controlled Agentic Workflows via Serverless CLI
-        # Provides structured agentic task execution through the AgentiCode CLI
-        # Tools:
-        # - run_agenticode_task: Execute agentic prompts via serverless CLI
-        # - run_code_generation: Generate code artifacts with controlled execution
-        # - run_file_operation: Perform file transformations (e.g., PDF to DOCX)
-        # - check_agenticode_status: Check serverless execution availability
-        # Uses code-manager's /serverless endpoints for isolated one-shot execution
-        if not os.getenv("AWP_AGENTICWORK_CLI_MCP_DISABLED", "false").lower() == "true":
-            awp_agenticwork_cli_env = {
-                "AGENTICODE_MANAGER_URL": os.getenv("AGENTICODE_MANAGER_URL", "http://agenticode-manager:3050"),
-                "AGENTICWORK_API_URL": os.getenv("AGENTICWORK_API_URL", "http://agenticwork-api:8000"),
-                "MCP_SERVICE_AUTH_KEY": os.getenv("MCP_SERVICE_AUTH_KEY", ""),  # Service-to-service auth
-                "INTERNAL_API_KEY": os.getenv("CODE_MANAGER_INTERNAL_KEY", ""),  # Auth key for agenticode-manager
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_agenticwork_cli"] = MCPServer(MCPServerConfig(
-                name="awp_agenticwork_cli",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-agenticwork-cli-mcp/server.py"],
-                env=awp_agenticwork_cli_env,
-                supports_obo=False  # Uses user_id and api_key parameters for per-user isolation
-            ))
-            logger.info("AWP AgenticWork CLI MCP server configured (Controlled agentic workflows via serverless CLI)")
-
-        # AWP ServiceNow MCP Server - Incident, Change, and Service Request management
-        # Uses Azure AD OBO for per-user access to their ServiceNow tickets
-        # User logs into AgenticWork, then can manage their SNOW tickets via LLM
-        if not os.getenv("AWP_SERVICENOW_MCP_DISABLED", "true").lower() == "true":
-            awp_servicenow_env = {
-                # ServiceNow instance
-                "SERVICENOW_INSTANCE_URL": os.getenv("SERVICENOW_INSTANCE_URL", ""),
-                "SERVICENOW_CLIENT_ID": os.getenv("SERVICENOW_CLIENT_ID", ""),
-                "SERVICENOW_CLIENT_SECRET": os.getenv("SERVICENOW_CLIENT_SECRET", ""),
-                # Azure AD for OBO token exchange
-                "AZURE_TENANT_ID": os.getenv("AZURE_TENANT_ID", ""),
-                "AZURE_CLIENT_ID": os.getenv("AZURE_CLIENT_ID", ""),
-                "AZURE_CLIENT_SECRET": os.getenv("AZURE_CLIENT_SECRET", ""),
-                # Fallback service account (when no user token)
-                "SERVICENOW_USERNAME": os.getenv("SERVICENOW_USERNAME", ""),
-                "SERVICENOW_PASSWORD": os.getenv("SERVICENOW_PASSWORD", ""),
-                "LOG_LEVEL": "info"
-            }
-
-            self.servers["awp_servicenow"] = MCPServer(MCPServerConfig(
-                name="awp_servicenow",
-                command=["fastmcp", "run", "-t", "stdio", "/app/mcp-servers/awp-servicenow-mcp/src/server.py"],
-                env=awp_servicenow_env,
-                supports_obo=True  # Uses Azure AD token exchange for per-user SNOW access
-            ))
-            logger.info("AWP ServiceNow MCP server configured (Incident/Change/Request management + OBO)")
-
-        # AWS MCP Servers (if enabled)
-        # AWS Knowledge MCP Server - Remote AWS-hosted service for docs, APIs, best practices
-        # Provides guidance on how to use AWS APIs - complements our awp_aws MCP
-        if not os.getenv("AWS_KNOWLEDGE_MCP_DISABLED", "false").lower() == "true":
-            self.servers["aws_knowledge"] = MCPServer(MCPServerConfig(
-                name="aws_knowledge",
-                command=["uvx", "fastmcp", "run", "https://knowledge-mcp.global.api.aws"],
-                env={"AWS_REGION": os.getenv("AWS_REGION", "")}
-            ))
-            logger.info("AWS Knowledge MCP server configured (AWS docs and best practices)")
-
         logger.info(f"Initialized {len(self.servers)} MCP servers")
 
     async def start_all(self):
         """Start all enabled MCP servers"""
         logger.info("Starting all MCP servers...")
 
-        for name, server in self.servers.items():
-            if server.config.enabled:
+        # Start concurrently so cold start costs the slowest server, not the sum of them all
+        start_slots = asyncio.Semaphore(MCP_START_CONCURRENCY)
+
+        async def start_server(server: MCPServer):
+            async with start_slots:
                 await server.start()
+
+        to_start = []
+        for name, server in self.servers.items():
+            if server.enabled:
+                to_start.append(server)
             else:
                 logger.info(f"Skipping disabled MCP server: {name}")
 
+        results = await asyncio.gather(*(start_server(server) for server in to_start), return_exceptions=True)
+        for server, result in zip(to_start, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to start MCP server {server.config.name}: {result}")
+
     async def stop_all(self):
         """Stop all MCP servers"""
         logger.info("Stopping all MCP servers...")
@@ -614,7 +627,21 @@ class MCPManager:
             request["params"]["arguments"]["meta"]["userAccessToken"] = user_token
             logger.debug(f"Injected user access token into request for {server_name}")
 
-        return await server.send_request(request)
+        if server.queued >= MCP_MAX_QUEUED:
+            raise MCPServerBusyError(f"MCP server {server_name} is busy ({server.queued} requests queued)")
+
+        server.queued += 1
+        try:
+            await server.request_slots.acquire()
+        finally:
+            server.queued -= 1
+
+        server.in_flight += 1
+        try:
+            return await server.send_request(request)
+        finally:
+            server.in_flight -= 1
+            server.request_slots.release()
 
 
     def get_server_status(self) -> Dict[str, Any]:
@@ -625,10 +652,12 @@ class MCPManager:
         for name, server in self.servers.items():
             status[name] = {
                 "status": server.status.value,
-                "enabled": server.config.enabled,
+                "enabled": server.enabled,
                 "last_error": server.last_error,
                 "transport": "stdio",
-                "pid": server.process.pid if server.process else None
+                "pid": server.process.pid if server.process else None,
+                "in_flight": server.in_flight,
+                "queued": server.queued
             }
         return status
 
@@ -801,24 +830,25 @@ class MCPManager:
 
         return all_tools
 
-    def _load_enabled_states_from_redis(self):
-        """Load runtime enabled states from Redis (overrides build-time config)"""
+    async def load_enabled_states(self):
+        """Load runtime enabled states from Redis (overrides build-time config) - call before start_all"""
         if not self.redis_client:
             return
 
         try:
-            for server_name in self.servers:
-                redis_key = f"{REDIS_MCP_ENABLED_PREFIX}{server_name}"
-                value = self.redis_client.get(redis_key)
+            # One round trip for every server's override
+            server_names = list(self.servers)
+            values = await self.redis_client.mget([f"{REDIS_MCP_ENABLED_PREFIX}{name}" for name in server_names])
+            for server_name, value in zip(server_names, values):
                 if value is not None:
                     # Value stored as b'true' or b'false'
                     enabled = value.decode('utf-8').lower() == 'true'
-                    self.servers[server_name].config.enabled = enabled
+                    self.servers[server_name].enabled = enabled
                     logger.info(f"[Redis] Loaded enabled state for {server_name}: {enabled}")
         except Exception as e:
             logger.error(f"Failed to load enabled states from Redis: {e}")
 
-    def _save_enabled_state_to_redis(self, server_name: str, enabled: bool):
+    async def _save_enabled_state_to_redis(self, server_name: str, enabled: bool):
         """Save server enabled state to Redis for persistence"""
         if not self.redis_client:
             logger.warning(f"Redis not available, enabled state for {server_name} not persisted")
@@ -826,7 +856,7 @@ class MCPManager:
 
         try:
             redis_key = f"{REDIS_MCP_ENABLED_PREFIX}{server_name}"
-            self.redis_client.set(redis_key, str(enabled).lower())
+            await self.redis_client.set(redis_key, str(enabled).lower())
             logger.info(f"[Redis] Saved enabled state for {server_name}: {enabled}")
             return True
         except Exception as e:
@@ -837,8 +867,8 @@ class MCPManager:
         """
         Enable or disable an MCP server at runtime.
 
-        - When enabled=True: Sets config.enabled=True and starts the server if not running
-        - When enabled=False: Sets config.enabled=False and stops the server if running
+        - When enabled=True: Sets server.enabled=True and starts the server if not running
+        - When enabled=False: Sets server.enabled=False and stops the server if running
 
         State is persisted to Redis so it survives restarts.
         """
@@ -846,13 +876,13 @@ class MCPManager:
             raise ValueError(f"Unknown server: {server_id}")
 
         server = self.servers[server_id]
-        previous_state = server.config.enabled
+        previous_state = server.enabled
 
         # Update the enabled state
-        server.config.enabled = enabled
+        server.enabled = enabled
 
         # Persist to Redis
-        persisted = self._save_enabled_state_to_redis(server_id, enabled)
+        persisted = await self._save_enabled_state_to_redis(server_id, enabled)
 
         # Start or stop based on new state
         action_taken = None
@@ -883,8 +913,8 @@ class MCPManager:
         """Get the enabled state of a specific server"""
         if server_id not in self.servers:
             raise ValueError(f"Unknown server: {server_id}")
-        return self.servers[server_id].config.enabled
+        return self.servers[server_id].enabled
 
     def list_server_enabled_states(self) -> Dict[str, bool]:
         """List enabled state for all servers"""
-        return {name: server.config.enabled for name, server in self.servers.items()}
\ No newline at end of file
+        return {name: server.enabled for name, server in self.servers.items()}
\ No newline at end of file
@@ -11,6 +11,7 @@ import logging
 import os
 import subprocess
 import time
+import orjson
 from typing import Dict, Optional, Any, List
 from dataclasses import dataclass
 from datetime import datetime, timedelta
@@ -238,7 +239,7 @@ class UserSessionManager:
 
         try:
             # Send request via stdin
-            request_json = json.dumps(request) + "\n"
+            request_json = orjson.dumps(request).decode('utf-8') + "\n"
             session.process.stdin.write(request_json)
             session.process.stdin.flush()
 
@@ -253,10 +254,10 @@ class UserSessionManager:
                     if line:
                         response_data += line
                         try:
-                            response = json.loads(response_data)
+                            response = orjson.loads(response_data)
                             if response.get("id") == request.get("id"):
                                 return response
-                        except json.JSONDecodeError:
+                        except orjson.JSONDecodeError:
                             continue
                 await asyncio.sleep(0.1)
 
@@ -324,8 +325,6 @@ class UserSessionManager:
         process: subprocess.Popen
     ) -> List[Dict[str, Any]]:
         """Query tools/list from an Azure MCP process via stdio"""
-        import json
-
         request = {
             "jsonrpc": "2.0",
             "id": 1,
@@ -334,7 +333,7 @@ class UserSessionManager:
 
         try:
             # Send request
-            request_json = json.dumps(request) + "\n"
+            request_json = orjson.dumps(request).decode('utf-8') + "\n"
             process.stdin.write(request_json)
             process.stdin.flush()
 
@@ -349,10 +348,10 @@ class UserSessionManager:
                     if line:
                         response_data += line
                         try:
-                            response = json.loads(response_data)
+                            response = orjson.loads(response_data)
                             if response.get("id") == 1 and "result" in response:
                                 return response["result"].get("tools", [])
-                        except json.JSONDecodeError:
+                        except orjson.JSONDecodeError:
                             continue
                 await asyncio.sleep(0.1)
 
@@ -0,0 +1,13 @@
+"""
+Test setup for the MCP proxy.
+
+The service runs from its own directory with src/ as the import root (see the Dockerfile),
+and main.py mounts src/static relative to the working directory.
+"""
+import os
+import sys
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(SERVICE_ROOT, "src"))
+os.chdir(SERVICE_ROOT)
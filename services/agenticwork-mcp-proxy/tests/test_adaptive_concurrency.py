@@ -0,0 +1,155 @@
+"""
+Tests for AdaptiveConcurrencyLimiter (AIMD backpressure on upstream HTTP calls)
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from main import AdaptiveConcurrencyLimiter, UpstreamBackoffError
+
+
+class FakeClock:
+    """Replaces the time module in main so latencies and backoff windows are exact"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(main, "time", clock)
+    return clock
+
+
+def call(limiter, clock, latency, status_code=200, headers=None):
+    """One acquire/release round trip taking `latency` seconds"""
+    started = asyncio.run(limiter.acquire())
+    clock.now += latency
+    limiter.release(started, status_code, headers)
+
+
+def test_fast_responses_raise_the_limit(clock):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    call(limiter, clock, 0.1)
+    call(limiter, clock, 0.1)
+    assert limiter.limit == main.UPSTREAM_INITIAL_CONCURRENCY + 1
+    assert limiter.in_flight == 0
+
+
+def test_limit_never_exceeds_ceiling(clock):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    for _ in range(2 * main.UPSTREAM_MAX_CONCURRENCY):
+        call(limiter, clock, 0.01)
+    assert limiter.limit == main.UPSTREAM_MAX_CONCURRENCY
+
+
+def test_timeout_halves_the_limit(clock):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    call(limiter, clock, 60.0, 504)  # How callers report httpx.TimeoutException
+    assert limiter.limit == main.UPSTREAM_INITIAL_CONCURRENCY / 2
+    assert limiter.open_until == 0.0  # Slow, not overloaded - no circuit
+
+
+@pytest.mark.parametrize("status_code", [0, 429, 502, 503])
+def test_overload_halves_the_limit_and_opens_the_circuit(clock, status_code):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    call(limiter, clock, 0.1, status_code)
+    assert limiter.limit == main.UPSTREAM_INITIAL_CONCURRENCY / 2
+
+    with pytest.raises(UpstreamBackoffError) as error:
+        asyncio.run(limiter.acquire())
+    assert error.value.retry_after == pytest.approx(main.UPSTREAM_DEFAULT_BACKOFF)
+
+    clock.now += main.UPSTREAM_DEFAULT_BACKOFF
+    call(limiter, clock, 0.1)
+    assert limiter.in_flight == 0
+
+
+def test_retry_after_sets_the_backoff(clock):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    call(limiter, clock, 0.1, 429, httpx.Headers({"retry-after": "7"}))
+    assert limiter.open_until == pytest.approx(clock.now + 7)
+
+
+def test_one_decrease_per_target_interval(clock):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    started = [asyncio.run(limiter.acquire()) for _ in range(3)]
+    clock.now += 0.1
+    for s in started:
+        limiter.release(s, 503)
+    assert limiter.limit == main.UPSTREAM_INITIAL_CONCURRENCY / 2
+
+
+def test_limit_never_drops_below_floor(clock):
+    limiter = AdaptiveConcurrencyLimiter("test")
+    for _ in range(20):
+        call(limiter, clock, 5.0, 504)
+        clock.now += main.UPSTREAM_TARGET_LATENCY
+    assert limiter.limit == main.UPSTREAM_MIN_CONCURRENCY
+
+
+def test_cancelled_waiter_gives_up_its_place(clock):
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter("test")
+        limiter.limit = 1.0
+        started = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert len(limiter._waiters) == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert len(limiter._waiters) == 0 and limiter.in_flight == 1
+
+        limiter.release(started, 200)
+        return limiter
+
+    assert asyncio.run(run()).in_flight == 0
+
+
+def test_waiter_cancelled_after_handover_passes_the_slot_on(clock):
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter("test")
+        limiter.limit = 1.0
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        # The slot is handed to `first`, which is cancelled before it runs again
+        limiter.discard()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        second_started = await asyncio.wait_for(second, timeout=1)
+        assert limiter.in_flight == 1
+        limiter.release(second_started, 200)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0 and not limiter._waiters
+
+
+def test_discard_after_cancelled_call_frees_the_slot_without_adapting(clock):
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter("test")
+        limiter.limit = 1.0
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.discard()  # What callers do when the upstream call itself is cancelled
+        await asyncio.wait_for(waiter, timeout=1)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.limit == 1.0
+    assert limiter.in_flight == 1
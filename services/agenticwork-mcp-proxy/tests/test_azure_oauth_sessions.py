@@ -0,0 +1,162 @@
+"""
+Tests for AzureOAuthService session storage (Redis hashes, plus JSON-string sessions from before them)
+"""
+import asyncio
+
+import orjson
+from redis.exceptions import ResponseError
+
+import azure_oauth
+from azure_oauth import AzureOAuthService
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for session storage: strings and hashes, with Redis' type errors"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def _hash(self, key):
+        value = self.data.get(key)
+        if isinstance(value, bytes):
+            raise ResponseError(WRONGTYPE)
+        return value
+
+    async def get(self, key):
+        value = self.data.get(key)
+        if isinstance(value, dict):
+            raise ResponseError(WRONGTYPE)
+        return value
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value if isinstance(value, bytes) else value.encode()
+        self.ttls[key] = ttl
+
+    async def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update((k.encode(), str(v).encode()) for k, v in mapping.items())
+
+    async def hget(self, key, field):
+        return (self._hash(key) or {}).get(field.encode())
+
+    async def hgetall(self, key):
+        return dict(self._hash(key) or {})
+
+    async def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+    async def ttl(self, key):
+        return self.ttls.get(key, -1) if key in self.data else -2
+
+    async def delete(self, key):
+        self.ttls.pop(key, None)
+        return int(self.data.pop(key, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        results = []
+        for number, (name, args, kwargs) in enumerate(self.commands, 1):
+            try:
+                results.append(await getattr(self.redis, name)(*args, **kwargs))
+            except ResponseError as e:
+                # Same annotation redis-py adds to errors raised inside a pipeline
+                raise ResponseError(f"Command # {number} ({name.upper()} {args[0]}) of pipeline caused error: {e}")
+        self.commands = []
+        return results
+
+
+def oauth_service(redis):
+    # Skips __init__, which needs Azure AD settings and builds the MSAL app
+    service = object.__new__(AzureOAuthService)
+    service.redis = redis
+    return service
+
+
+def test_hash_session_round_trip():
+    async def run():
+        redis = FakeRedis()
+        service = oauth_service(redis)
+        await redis.hset("session:{00ab}:00ab.new", mapping={"user_id": "user-1", "email": "a@example.com"})
+        await redis.expire("session:{00ab}:00ab.new", 60)
+        return (
+            await service.get_session("00ab.new"),
+            await service.get_session_field("00ab.new", "user_id"),
+            await service.get_session("00ab.missing"),
+        )
+
+    session, user_id, missing = asyncio.run(run())
+    assert session["user_id"] == "user-1" and session["email"] == "a@example.com"
+    assert session["refresh_token"] is None
+    assert user_id == "user-1"
+    assert missing is None
+
+
+def test_legacy_string_session_is_still_readable():
+    legacy = {
+        "user_id": "user-1",
+        "email": "a@example.com",
+        "name": "A User",
+        "tenant_id": "tenant",
+        "access_token": "token",
+        "refresh_token": None,
+        "created_at": "2026-10-14T10:00:00",
+        "expires_at": "2026-10-14T11:00:00",
+    }
+
+    async def run():
+        redis = FakeRedis()
+        service = oauth_service(redis)
+        # How sessions were stored before the hash layout
+        await redis.setex("session:legacyid", 86400, orjson.dumps(legacy))
+        session = await service.get_session("legacyid")
+        user_id = await service.get_session_field("legacyid", "user_id")
+        deleted = await service.delete_session("legacyid")
+        return session, user_id, deleted, await service.get_session("legacyid")
+
+    session, user_id, deleted, after_delete = asyncio.run(run())
+    assert session == legacy
+    assert user_id == "user-1"
+    assert deleted
+    assert after_delete is None
+
+
+def test_create_session_is_stored_before_returning():
+    user_info = {
+        "user_id": "user-1",
+        "email": "a@example.com",
+        "name": "A User",
+        "tenant_id": "tenant",
+        "access_token": "token",
+        "refresh_token": None,
+        "token_expires_epoch": 1_800_000_000,
+    }
+
+    async def run():
+        redis = FakeRedis()
+        service = oauth_service(redis)
+        session_id = await service.create_session(user_info)
+        return redis.ttls, await service.get_session(session_id)
+
+    ttls, session = asyncio.run(run())
+    assert list(ttls.values()) == [azure_oauth.SESSION_TTL]
+    assert session["user_id"] == "user-1" and session["expires_at"] == "1800000000"
+    assert session["refresh_token"] is None
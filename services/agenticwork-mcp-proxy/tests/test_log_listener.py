@@ -0,0 +1,38 @@
+"""
+Tests for the background log output thread started and stopped by lifespan
+"""
+import logging
+import logging.handlers
+
+import main
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_listener_only_runs_between_start_and_stop(monkeypatch):
+    assert main.log_listener is None  # Importing the module starts nothing
+
+    root_logger = logging.getLogger()
+    handler = RecordingHandler()
+    monkeypatch.setattr(root_logger, "handlers", [handler])
+    log = logging.getLogger("test-log-listener")
+
+    main.start_log_listener()
+    try:
+        assert [type(h) for h in root_logger.handlers] == [logging.handlers.QueueHandler]
+        log.warning("while running")
+    finally:
+        main.stop_log_listener()
+
+    # Queued records are flushed on stop, and later ones go straight to the original handler
+    assert root_logger.handlers == [handler]
+    log.warning("after stop")
+    assert handler.messages == ["while running", "after stop"]
+    assert main.log_listener is None
@@ -0,0 +1,145 @@
+"""
+Tests for the pipelined stdio transport in mcp_manager, run against a small fake MCP server
+"""
+import asyncio
+import sys
+
+import pytest
+
+import mcp_manager
+from mcp_manager import MCPManager, MCPServer, MCPServerBusyError, MCPServerConfig, MCPServerStatus
+
+# Answers initialize and echoes params back, except:
+#   sleep  - answers after params["seconds"] (other requests are answered meanwhile)
+#   ignore - never answers
+#   exit   - exits without answering, closing stdout
+FAKE_SERVER = r'''
+import json
+import os
+import sys
+import threading
+
+write_lock = threading.Lock()
+
+def reply(message):
+    line = json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": message.get("params") or {}})
+    with write_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+print("fake MCP server ready", flush=True)  # Non-JSON output is ignored by the reader
+for line in sys.stdin:
+    message = json.loads(line)
+    if "id" not in message:
+        continue
+    method = message.get("method")
+    if method == "sleep":
+        threading.Timer(message["params"]["seconds"], reply, (message,)).start()
+    elif method == "ignore":
+        pass
+    elif method == "exit":
+        os._exit(0)
+    else:
+        reply(message)
+'''
+
+
+@pytest.fixture
+def server_command(tmp_path):
+    script = tmp_path / "fake_mcp_server.py"
+    script.write_text(FAKE_SERVER)
+    return [sys.executable, str(script)]
+
+
+def request(method, request_id="1", **params):
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+async def started_server(command) -> MCPServer:
+    server = MCPServer(MCPServerConfig(name="fake", command=command, env={}))
+    await server.start()
+    assert server.status == MCPServerStatus.RUNNING
+    return server
+
+
+def test_out_of_order_responses_reach_their_callers(server_command):
+    async def run():
+        server = await started_server(server_command)
+        try:
+            # Both callers use id "1" - each must still get its own response
+            slow = asyncio.create_task(server.send_request(request("sleep", seconds=0.3, tag="slow")))
+            fast = asyncio.create_task(server.send_request(request("echo", tag="fast")))
+            done, _ = await asyncio.wait({slow, fast}, return_when=asyncio.FIRST_COMPLETED)
+            assert done == {fast}
+            return await slow, await fast, dict(server.pending)
+        finally:
+            await server.stop()
+
+    slow, fast, pending = asyncio.run(run())
+    assert slow["result"]["tag"] == "slow" and slow["id"] == "1"
+    assert fast["result"]["tag"] == "fast" and fast["id"] == "1"
+    assert pending == {}
+
+
+def test_timeout_removes_pending_request(server_command):
+    async def run():
+        server = await started_server(server_command)
+        try:
+            with pytest.raises(RuntimeError, match="within 0.2s"):
+                await server.send_request(request("ignore"), timeout=0.2)
+            assert server.pending == {}
+            # The server keeps working for later requests
+            response = await server.send_request(request("echo", tag="after"))
+            return server.status, response
+        finally:
+            await server.stop()
+
+    status, response = asyncio.run(run())
+    assert status == MCPServerStatus.RUNNING
+    assert response["result"]["tag"] == "after"
+
+
+def test_reader_exit_fails_all_pending_requests(server_command):
+    async def run():
+        server = await started_server(server_command)
+        try:
+            waiting = [asyncio.create_task(server.send_request(request("ignore", str(i)))) for i in range(3)]
+            await asyncio.sleep(0.1)
+            assert len(server.pending) == 3
+            waiting.append(asyncio.create_task(server.send_request(request("exit"))))
+            results = await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), timeout=5)
+            return results, dict(server.pending)
+        finally:
+            await server.stop()
+
+    results, pending = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) and "closed its output" in str(result) for result in results)
+    assert pending == {}
+
+
+def test_route_request_rejects_when_queue_is_full(server_command, monkeypatch):
+    monkeypatch.setattr(mcp_manager, "MCP_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(mcp_manager, "MCP_MAX_QUEUED", 1)
+
+    async def run():
+        server = await started_server(server_command)
+        manager = MCPManager()
+        manager.servers = {"fake": server}
+        try:
+            running = asyncio.create_task(manager.route_request("fake", request("sleep", seconds=0.3)))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(manager.route_request("fake", request("echo", "2")))
+            await asyncio.sleep(0.05)
+            assert (server.in_flight, server.queued) == (1, 1)
+
+            with pytest.raises(MCPServerBusyError):
+                await manager.route_request("fake", request("echo", "3"))
+
+            results = await asyncio.gather(running, queued)
+            return results, server.in_flight, server.queued
+        finally:
+            await server.stop()
+
+    results, in_flight, queued = asyncio.run(run())
+    assert [result["id"] for result in results] == ["1", "2"]
+    assert (in_flight, queued) == (0, 0)
@@ -0,0 +1,182 @@
+"""
+Tests for coalescing identical concurrent MCP requests (route_request_coalesced)
+"""
+import asyncio
+import gc
+
+import pytest
+
+import main
+
+
+class FakeMCPManager:
+    """Stands in for MCPManager - counts downstream calls and holds them until released"""
+
+    def __init__(self, error=None):
+        self.servers = {}
+        self.calls = 0
+        self.error = error
+        self.released = asyncio.Event()
+        self.cancelled = False
+
+    async def route_request(self, server_name, request, user_token=None):
+        self.calls += 1
+        try:
+            await self.released.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return {"jsonrpc": "2.0", "id": request["id"], "result": {"tools": [{"name": "echo"}]}}
+
+
+@pytest.fixture
+def fake_manager(monkeypatch):
+    def install(error=None):
+        manager = FakeMCPManager(error)
+        monkeypatch.setattr(main, "mcp_manager", manager)
+        monkeypatch.setattr(main, "log_queue", asyncio.Queue())
+        return manager
+    return install
+
+
+def tools_list(request_id):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/list", "params": {}}
+
+
+def drain(queue):
+    logs = []
+    while not queue.empty():
+        logs.append(queue.get_nowait())
+    return logs
+
+
+def test_identical_requests_share_one_call(fake_manager):
+    async def run():
+        manager = fake_manager()
+        first = asyncio.create_task(main.route_request_coalesced("srv", tools_list("a")))
+        second = asyncio.create_task(main.route_request_coalesced("srv", tools_list("b")))
+        await asyncio.sleep(0)
+        manager.released.set()
+        return manager, await first, await second
+
+    manager, first, second = asyncio.run(run())
+    assert manager.calls == 1
+    assert first["id"] == "a" and second["id"] == "b"
+    assert first["result"] == second["result"] == {"tools": [{"name": "echo"}]}
+    assert main._inflight_requests == {}
+
+
+def test_different_params_are_not_shared(fake_manager):
+    async def run():
+        manager = fake_manager()
+        other = {**tools_list("b"), "params": {"cursor": "2"}}
+        tasks = [
+            asyncio.create_task(main.route_request_coalesced("srv", tools_list("a"))),
+            asyncio.create_task(main.route_request_coalesced("srv", other)),
+        ]
+        await asyncio.sleep(0)
+        manager.released.set()
+        await asyncio.gather(*tasks)
+        return manager
+
+    assert asyncio.run(run()).calls == 2
+
+
+def test_each_caller_logs_its_own_request(fake_manager):
+    async def run():
+        manager = fake_manager()
+        headers = main.MCPRequestHeaders(None, None, None, False)
+        calls = [
+            asyncio.create_task(main.proxy_mcp_request(
+                main.MCPRequest(method="tools/list", id=request_id, server="srv"),
+                headers,
+                {"user_id": user_id, "user_name": user_id},
+            ))
+            for request_id, user_id in (("a", "user-1"), ("b", "user-2"))
+        ]
+        await asyncio.sleep(0)
+        manager.released.set()
+        responses = await asyncio.gather(*calls)
+        return manager, responses, drain(main.log_queue)
+
+    manager, responses, logs = asyncio.run(run())
+    assert manager.calls == 1
+    assert [response.id for response in responses] == ["a", "b"]
+    assert sorted(log["user_id"] for log in logs) == ["user-1", "user-2"]
+    assert all(log["success"] and log["method"] == "tools/list" for log in logs)
+
+
+def test_error_reaches_every_waiter(fake_manager):
+    async def run():
+        manager = fake_manager(RuntimeError("server exploded"))
+        tasks = [
+            asyncio.create_task(main.route_request_coalesced("srv", tools_list(request_id)))
+            for request_id in ("a", "b")
+        ]
+        await asyncio.sleep(0)
+        manager.released.set()
+        return manager, await asyncio.gather(*tasks, return_exceptions=True)
+
+    manager, results = asyncio.run(run())
+    assert manager.calls == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "server exploded" for result in results)
+    assert main._inflight_requests == {}
+
+
+def test_cancelled_waiter_does_not_cancel_the_others(fake_manager):
+    async def run():
+        manager = fake_manager()
+        first = asyncio.create_task(main.route_request_coalesced("srv", tools_list("a")))
+        second = asyncio.create_task(main.route_request_coalesced("srv", tools_list("b")))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        manager.released.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return manager, await second
+
+    manager, second = asyncio.run(run())
+    assert manager.calls == 1
+    assert not manager.cancelled
+    assert second["id"] == "b"
+    assert main._inflight_requests == {}
+
+
+def test_caller_after_completion_starts_a_new_call(fake_manager):
+    async def run():
+        manager = fake_manager()
+        manager.released.set()
+        first = asyncio.create_task(main.route_request_coalesced("srv", tools_list("a")))
+        await asyncio.sleep(0)
+        [shared] = main._inflight_requests.values()
+        # Arrive right as the shared call finishes, before its done-callbacks have run
+        while not shared.done():
+            await asyncio.sleep(0)
+        second = await main.route_request_coalesced("srv", tools_list("b"))
+        return manager, await first, second
+
+    manager, first, second = asyncio.run(run())
+    assert manager.calls == 2
+    assert (first["id"], second["id"]) == ("a", "b")
+
+
+def test_error_with_every_waiter_cancelled_is_retrieved(fake_manager):
+    async def run():
+        loop_errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+        manager = fake_manager(RuntimeError("server exploded"))
+        waiter = asyncio.create_task(main.route_request_coalesced("srv", tools_list("a")))
+        await asyncio.sleep(0)
+        [shared] = main._inflight_requests.values()
+        waiter.cancel()
+        manager.released.set()
+        await asyncio.wait({waiter, shared})  # Waits without retrieving the exception
+        del shared
+        gc.collect()
+        return loop_errors
+
+    assert asyncio.run(run()) == []
+    assert main._inflight_requests == {}
@@ -0,0 +1,51 @@
+"""
+Tests for msgspec-decoded request bodies (struct_body / struct_openapi)
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import main
+
+
+def post_embeddings(content):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://proxy") as client:
+            return await client.post(
+                "/v1/embeddings", content=content, headers={"content-type": "application/json"}
+            )
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b'{}', [{"type": "missing", "loc": ["body", "input"], "msg": "Field required"}]),
+    (b'{"input": ["a", 3]}', [{"type": "value_error", "loc": ["body", "input", 1], "msg": "Expected `str`, got `int`"}]),
+    (b'{"input": "a", "dimensions": "x"}', [
+        {"type": "value_error", "loc": ["body", "dimensions"], "msg": "Expected `int | null`, got `str`"}
+    ]),
+])
+def test_validation_errors_use_fastapi_format(content, expected):
+    response = post_embeddings(content)
+    assert response.status_code == 422
+    assert response.json() == {"detail": expected}
+
+
+def test_malformed_json_is_reported_as_json_invalid():
+    response = post_embeddings(b'{"input": ')
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["type"] == "json_invalid" and error["loc"] == ["body"]
+
+
+def test_request_schemas_are_in_openapi():
+    paths = main.app.openapi()["paths"]
+    call_body = paths["/call"]["post"]["requestBody"]
+    call_schema = call_body["content"]["application/json"]["schema"]
+    assert call_body["required"] is True
+    assert call_schema["required"] == ["server", "tool"]
+    assert set(call_schema["properties"]) == {"server", "tool", "arguments"}
+
+    embeddings_schema = paths["/v1/embeddings"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert embeddings_schema["required"] == ["input"]